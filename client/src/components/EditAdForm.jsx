@@ -148,6 +148,7 @@ function EditAdForm() {
     });
 
     form.append("pk", ad.id);
+    form.append("version", ad.version);
     form.append("title", title);
     form.append("description", description);
     form.append("price", price);
@@ -170,7 +171,10 @@ function EditAdForm() {
       setIsModalOpen(true);
       setModalContent({
         title: "Error!",
-        message: "An error occurred while editing your ad. Please try again",
+        message:
+          error.response?.status === 412
+            ? "This ad was changed somewhere else while you were editing it. Please reload the page and try again"
+            : "An error occurred while editing your ad. Please try again",
       });
     }
     setTimeout(() => {
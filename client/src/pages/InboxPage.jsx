@@ -30,23 +30,47 @@ function InboxPage() {
    */
   useEffect(() => {
     // WebSocket connection setup
+    let unmounted = false; // Set when leaving the page, so the socket is not reopened
+    let retries = 0;
+    let retryTimer = null;
 
-    ws.current = new WebSocket(`${WS_URL}/chat/?token=${apiToken}`);
-    
-    ws.current.onopen = () => console.log('WebSocket Connected');
-    ws.current.onmessage = (event) => {
-      const messageData = JSON.parse(event.data);
-      // Assuming messageData format is suitable or you adjust as needed
-      // Update activeChatMessages if the message belongs to the active conversation
-      setMessages((prevMessages) => [...prevMessages, messageData]);
+    const connect = () => {
+      ws.current = new WebSocket(`${WS_URL}/chat/?token=${apiToken}`);
+
+      ws.current.onopen = () => {
+        retries = 0;
+        console.log('WebSocket Connected');
+      };
+      ws.current.onmessage = (event) => {
+        const messageData = JSON.parse(event.data);
+        // Pushed events (e.g. saved search matches) are not chat messages
+        if (messageData.event) return;
+        // Assuming messageData format is suitable or you adjust as needed
+        // Update activeChatMessages if the message belongs to the active conversation
+        setMessages((prevMessages) => [...prevMessages, messageData]);
+      };
+      ws.current.onerror = (error) => console.error('WebSocket Error: ', error);
+      ws.current.onclose = () => {
+        console.log('WebSocket Disconnected');
+        if (unmounted) return;
+        // Server workers are recycled regularly and close their sockets (code 1012) when they stop.
+        // Reconnect after a randomised, growing delay so the clients of a worker do not all return at once.
+        const delay = Math.min(30000, 1000 * 2 ** retries) * (0.5 + Math.random());
+        retries += 1;
+        retryTimer = setTimeout(connect, delay);
+      };
     };
-    ws.current.onerror = (error) => console.error('WebSocket Error: ', error);
-    ws.current.onclose = () => console.log('WebSocket Disconnected');
+    connect();
 
-    const handleClose = () => ws.current.close();
+    const handleClose = () => {
+      unmounted = true;
+      ws.current.close();
+    };
     window.addEventListener('beforeunload', handleClose);
 
     return () => {
+      unmounted = true;
+      clearTimeout(retryTimer);
       ws.current.close();
       window.removeEventListener('beforeunload', handleClose);
     };
@@ -1,33 +1,18 @@
 from django.contrib import admin
-from .models import Ad, AdImage, AdReport
-from django.contrib.admin.widgets import AdminFileWidget
-from django.utils.safestring import mark_safe
+from .models import Ad, AdImage, AdReport, SavedSearch
 from django.db import models
 
-class AdminImageWidget(AdminFileWidget): # Custom widget for rendering image fields in the admin panel.
-    def render(self, name, value, attrs=None, renderer=None):
-        output = []
-
-        if value and getattr(value, "url", None):
-            image_url = value.url
-            file_name = str(value)
-
-            output.append(
-                f' <a href="{image_url}" target="_blank">'
-                f'  <img src="{image_url}" alt="{file_name}" width="150" height="150" '
-                f'style="object-fit: cover;"/> </a>')
-
-        output.append(super(AdminFileWidget, self).render(name, value, attrs, renderer))
-        return mark_safe(u''.join(output))
-    
 class AdImageInline(admin.TabularInline): # Inline admin class for managing AdImage objects in the Ad admin panel.
     model = AdImage
     extra = 1 
     fields = ['image', 'uploaded_at']
     readonly_fields = ['uploaded_at']
-    formfield_overrides = {
-        models.ImageField: {'widget': AdminImageWidget}
-    }
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs): # Image fields get a preview; its widget is only imported once an admin form is built
+        if isinstance(db_field, models.ImageField):
+            from .widgets import AdminImageWidget
+            kwargs['widget'] = AdminImageWidget
+        return super().formfield_for_dbfield(db_field, request, **kwargs)
     
 class AdReportInline(admin.TabularInline): # Inline admin class for managing AdReport objects in the Ad admin panel.
     model = AdReport
@@ -58,7 +43,13 @@ class AdReportAdmin(admin.ModelAdmin): # Admin class for managing AdReport objec
     search_fields = ['ad__title', 'reported_by__username', 'other_details']
     readonly_fields = ['ad', 'reported_by', 'report_reason', 'other_details', 'reported_at']
 
+class SavedSearchAdmin(admin.ModelAdmin): # Admin class for managing SavedSearch objects in the admin panel.
+    list_display = ['user', 'name', 'category', 'type', 'location', 'near', 'min_price', 'max_price', 'created_at']
+    list_filter = ['category', 'location']
+    search_fields = ['user__username', 'name']
+
 # Register the admin classes
 admin.site.register(AdReport, AdReportAdmin)
 admin.site.register(Ad, AdAdmin)
 admin.site.register(AdImage)
+admin.site.register(SavedSearch, SavedSearchAdmin)
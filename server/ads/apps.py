@@ -1,5 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 class AdsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField' # Set the default auto field for models
     name = 'ads' # Set the name of the app
+
+    def ready(self): # Drop cached facet counts whenever an ad is created, edited or deleted
+        from .facets import invalidate_facets
+        post_save.connect(invalidate_facets, sender='ads.Ad', dispatch_uid='ads.invalidate_facets.save')
+        post_delete.connect(invalidate_facets, sender='ads.Ad', dispatch_uid='ads.invalidate_facets.delete')
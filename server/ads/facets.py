@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .filters import build_ad_filters
+from .models import Ad
+
+# Lower bounds of the price histogram buckets; the last bucket is open ended
+PRICE_BUCKETS = [0, 10, 25, 50, 100, 250, 500, 1000]
+
+FACET_CHOICES = {
+    'category': Ad.CATEGORY_CHOICES,
+    'location': Ad.LOCATION_CHOICES,
+    'type': Ad.TYPE_CHOICES,
+    'status': [(code, label) for code, label in Ad.STATUS_CHOICES if code != 'DE'],
+}
+
+FACET_PARAMS = ('category', 'type', 'location', 'near', 'radius', 'status', 'min_price', 'max_price')
+GENERATION_KEY = 'ads:facets:generation'
+
+
+def combine(filters, exclude=None): # AND together every filter except the `exclude` dimension
+    condition = Q()
+    for dimension, filter_condition in filters.items():
+        if dimension != exclude:
+            condition &= filter_condition
+    return condition
+
+
+def compute_facets(filters):
+    """
+    Counts ads per category, location, type, status and price bucket in a single
+    aggregate query (one conditional COUNT per facet value).
+
+    Each facet is conditioned on every current filter except its own, so the
+    counts show how many results picking another value would give.
+    """
+    aggregates = {'total': Count('id', filter=combine(filters))}
+    for dimension, choices in FACET_CHOICES.items():
+        others = combine(filters, exclude=dimension)
+        for code, label in choices:
+            aggregates[f'{dimension}_{code}'] = Count('id', filter=others & Q(**{dimension: code}))
+
+    others = combine(filters, exclude='price')
+    for index, low in enumerate(PRICE_BUCKETS):
+        bucket = Q(price__gte=low)
+        if index + 1 < len(PRICE_BUCKETS):
+            bucket &= Q(price__lt=PRICE_BUCKETS[index + 1])
+        aggregates[f'price_{index}'] = Count('id', filter=others & bucket)
+    aggregates['price_unset'] = Count('id', filter=others & Q(price__isnull=True))
+
+    counts = Ad.objects.exclude(status='DE').aggregate(**aggregates)
+
+    facets = {'total': counts['total']}
+    for dimension, choices in FACET_CHOICES.items():
+        facets[dimension] = [
+            {'value': code, 'label': label, 'count': counts[f'{dimension}_{code}']} for code, label in choices
+        ]
+    facets['price'] = [
+        {
+            'min': low,
+            'max': PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None,
+            'count': counts[f'price_{index}'],
+        }
+        for index, low in enumerate(PRICE_BUCKETS)
+    ]
+    facets['price_unset'] = counts['price_unset']
+    return facets
+
+
+def get_facets(query_params):
+    """
+    Returns the facet counts for the given browse parameters, cached for
+    AD_FACETS_CACHE_TIMEOUT seconds. Cached entries are keyed by a generation
+    number that is bumped whenever an ad changes, so edits show up immediately.
+    """
+    filters = build_ad_filters(query_params)
+    params = '&'.join(f'{name}={query_params.get(name)}' for name in FACET_PARAMS if query_params.get(name) is not None)
+    key = f'ads:facets:{cache.get_or_set(GENERATION_KEY, 1, None)}:{params}'
+
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(filters)
+        cache.set(key, facets, settings.AD_FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def invalidate_facets(**kwargs): # Signal receiver: start a new cache generation after any ad change
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, None)
@@ -0,0 +1,65 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .regions import DEFAULT_RADIUS_KM, regions_within
+
+
+def nearby_regions(near, radius):
+    """
+    Validates the `near`/`radius` query parameters and returns the matching
+    (region, distance_km) pairs, nearest first.
+    """
+    try:
+        radius = float(radius) if radius is not None else DEFAULT_RADIUS_KM
+    except ValueError:
+        raise ValidationError({'radius': 'Radius must be a number of kilometres.'})
+    try:
+        return regions_within(near, radius)
+    except KeyError:
+        raise ValidationError({'near': f'Unknown region "{near}".'})
+
+
+def parse_price(name, value): # Validate a `min_price`/`max_price` query parameter
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        price = None
+    if price is None or not price.is_finite():
+        raise ValidationError({name: 'Price must be a number.'})
+    return price
+
+
+def build_ad_filters(query_params):
+    """
+    Translates the ad browse query parameters into one Q object per filter dimension
+    ('category', 'type', 'location', 'status', 'price').
+
+    Keeping the dimensions separate lets the facet counts apply every filter except
+    the one being counted.
+    """
+    filters = {}
+    for dimension in ('category', 'type', 'status'):
+        value = query_params.get(dimension)
+        if value is not None:
+            filters[dimension] = Q(**{dimension: value})
+
+    location = Q()
+    if query_params.get('location') is not None:
+        location &= Q(location=query_params.get('location'))
+    if query_params.get('near') is not None:
+        nearby = nearby_regions(query_params.get('near'), query_params.get('radius'))
+        location &= Q(location__in=[region for region, distance_km in nearby])
+    if location:
+        filters['location'] = location
+
+    price = Q()
+    if query_params.get('min_price') is not None:
+        price &= Q(price__gte=parse_price('min_price', query_params.get('min_price')))
+    if query_params.get('max_price') is not None:
+        price &= Q(price__lte=parse_price('max_price', query_params.get('max_price')))
+    if price:
+        filters['price'] = price
+
+    return filters
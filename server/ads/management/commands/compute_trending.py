@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ads.trending import compute_trending, view_buffer
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the trending ads and per-user recommendations. Run it periodically, e.g. from cron:
+
+        */15 * * * * cd /path/to/server && .venv/bin/python manage.py compute_trending
+    """
+    help = 'Recompute trending scores and "similar ads" recommendations'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        view_buffer.flush()
+        trending, recommendations = compute_trending()
+        self.stdout.write(
+            f'Stored {trending} trending ads and {recommendations} recommendations '
+            f'in {time.perf_counter() - start:.2f}s'
+        )
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from users.models import CustomUser
 
 class Ad(models.Model):
@@ -14,6 +14,8 @@ class Ad(models.Model):
         status (str): The status of the advertisement. Choices are 'SO' (Sold), 'NS' (Not Sold), 'DE' (Deleted).
         price (Decimal): The price of the advertisement.
         created_at (datetime): The date and time when the advertisement was created.
+        updated_at (datetime): The date and time when the advertisement was last edited.
+        version (int): Incremented on every edit; clients send it back so concurrent edits are detected.
         owned_by (CustomUser): The user who owns the advertisement.
     """
 
@@ -75,10 +77,16 @@ class Ad(models.Model):
     status = models.CharField(max_length=2, choices=STATUS_CHOICES, default='NS')
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=1)
     owned_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='ads')
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves location filters and the per-region lookups of `near=` proximity searches
+            models.Index(fields=['location', '-created_at'], name='ads_location_recent_idx'),
+        ]
 
     def __str__(self): # Returns a string representation of the advertisement.
         return self.title
@@ -121,4 +129,148 @@ class AdReport(models.Model):
 
     def __str__(self):
         reported_by_str = self.reported_by.username if self.reported_by else 'Anonymous'
-        return f"{self.get_report_reason_display()} - {reported_by_str} - {self.reported_at.strftime('%Y-%m-%d %H:%M:%S')}"
\ No newline at end of file
+        return f"{self.get_report_reason_display()} - {reported_by_str} - {self.reported_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+class SavedSearch(models.Model):
+    """
+    A set of browse filters a user wants to be notified about when new ads match.
+
+    Attributes:
+        user (CustomUser): The user who saved the search.
+        name (str): Optional label shown to the user.
+        category, type, location (str): Exact-match filters; blank means any value.
+        near (str): Region for a proximity filter, combined with `radius` (km).
+        min_price, max_price (Decimal): Inclusive price bounds; null means unbounded.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='saved_searches')
+    name = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=2, choices=Ad.CATEGORY_CHOICES, blank=True)
+    type = models.CharField(max_length=2, choices=Ad.TYPE_CHOICES, blank=True)
+    location = models.CharField(max_length=2, choices=Ad.LOCATION_CHOICES, blank=True)
+    near = models.CharField(max_length=2, choices=Ad.LOCATION_CHOICES, blank=True)
+    radius = models.FloatField(null=True, blank=True)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.name or f"Saved search {self.pk} of {self.user}"
+
+    def save(self, *args, **kwargs): # Keep the inverted index in step with the filters, however the search is saved
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.rebuild_keys()
+
+    def near_locations(self): # Regions covered by the proximity filter, or None without one
+        from .regions import DEFAULT_RADIUS_KM, regions_within
+        if not self.near:
+            return None
+        radius = self.radius if self.radius is not None else DEFAULT_RADIUS_KM
+        return [region for region, distance_km in regions_within(self.near, radius)]
+
+    def index_keys(self):
+        """
+        Returns the inverted index keys for this search, built from its most selective
+        filter: its category, else its location(s), else its type, else the catch-all '*'.
+        Every search that could match an ad is reachable from one of the ad's keys.
+        """
+        if self.category:
+            return [f'category:{self.category}']
+        locations = [self.location] if self.location else self.near_locations()
+        if locations:
+            return [f'location:{location}' for location in locations]
+        if self.type:
+            return [f'type:{self.type}']
+        return ['*']
+
+    def rebuild_keys(self): # Replace this search's rows in the inverted index
+        self.keys.all().delete()
+        SavedSearchKey.objects.bulk_create(SavedSearchKey(saved_search=self, key=key) for key in self.index_keys())
+
+    def matches_ad(self, ad): # Full predicate check for a candidate found through the index
+        if self.category and ad.category != self.category:
+            return False
+        if self.type and ad.type != self.type:
+            return False
+        if self.location and ad.location != self.location:
+            return False
+        locations = self.near_locations()
+        if locations is not None and ad.location not in locations:
+            return False
+        if self.min_price is not None and (ad.price is None or ad.price < self.min_price):
+            return False
+        if self.max_price is not None and (ad.price is None or ad.price > self.max_price):
+            return False
+        return True
+
+
+class SavedSearchKey(models.Model):
+    # Inverted index entry mapping a filter value (e.g. 'category:TB') to a saved search
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='keys')
+    key = models.CharField(max_length=20, db_index=True)
+
+
+class SavedSearchMatch(models.Model):
+    # A new ad that matched a saved search, kept so users who were offline can catch up
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name='matches')
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='saved_search_matches')
+    matched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-matched_at']
+        constraints = [
+            models.UniqueConstraint(fields=['saved_search', 'ad'], name='unique_saved_search_match'),
+        ]
+
+
+class AdViewCount(models.Model):
+    """
+    Ad detail views, aggregated per viewer and hour. Rows are written in batches by
+    the in-process view buffer (ads.trending) and consumed by `compute_trending`.
+
+    Attributes:
+        ad (Ad): The viewed advertisement.
+        viewer (CustomUser): The signed in viewer, or None for anonymous views.
+        period (datetime): Start of the hour the views happened in.
+        views (int): Number of views in that hour (several rows may share a key).
+    """
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='view_counts')
+    viewer = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    period = models.DateTimeField(db_index=True)
+    views = models.PositiveIntegerField(default=1)
+
+
+class TrendingAd(models.Model):
+    """
+    Precomputed trending score of an ad, rebuilt periodically by `compute_trending`.
+    """
+    ad = models.OneToOneField(Ad, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    score = models.FloatField()
+    views = models.PositiveIntegerField(default=0)
+    contacts = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='ads_trending_score_idx'),
+        ]
+
+
+class Recommendation(models.Model):
+    """
+    A precomputed "similar ads" suggestion for a user, rebuilt by `compute_trending`.
+    `rank` orders a user's recommendations (0 is the best match).
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='recommendations')
+    ad = models.ForeignKey(Ad, on_delete=models.CASCADE, related_name='recommendations')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['rank']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='ads_recommendation_rank_unique'),
+        ]
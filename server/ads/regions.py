@@ -0,0 +1,51 @@
+import math
+
+# Approximate centre (latitude, longitude) of each Ad.LOCATION_CHOICES region.
+# 'OT' (Other Locations) has no fixed position and only ever matches itself.
+REGION_CENTROIDS = {
+    'TE': (43.670, -79.370),  # Toronto & East York
+    'EB': (43.650, -79.550),  # Etobicoke
+    'NY': (43.762, -79.411),  # North York
+    'SC': (43.776, -79.232),  # Scarborough
+    'VA': (43.836, -79.498),  # Vaughan
+    'MK': (43.856, -79.337),  # Markham
+    'RH': (43.883, -79.440),  # Richmond Hill
+    'MV': (43.589, -79.644),  # Mississauga
+    'BR': (43.732, -79.762),  # Brampton
+    'AP': (43.845, -79.055),  # Ajax & Pickering
+    'OS': (43.897, -78.905),  # Whitby & Oshawa
+    'OK': (43.490, -79.780),  # Oakville & Milton
+}
+
+DEFAULT_RADIUS_KM = 15
+
+
+def haversine_km(origin, destination): # Great-circle distance between two (lat, lon) points in kilometres
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+
+def build_distance_table():
+    """
+    Precomputes, for every region, the list of (region, distance_km) pairs sorted
+    from nearest to farthest, starting with the region itself at distance 0.
+    """
+    table = {}
+    for origin, origin_centre in REGION_CENTROIDS.items():
+        distances = [(region, round(haversine_km(origin_centre, centre), 1)) for region, centre in REGION_CENTROIDS.items()]
+        table[origin] = sorted(distances, key=lambda pair: (pair[1], pair[0]))
+    table['OT'] = [('OT', 0.0)]
+    return table
+
+
+REGION_DISTANCES = build_distance_table()
+
+
+def regions_within(origin, radius_km=DEFAULT_RADIUS_KM):
+    """
+    Returns the regions within `radius_km` of `origin` as (region, distance_km)
+    pairs ordered by distance. Raises KeyError for unknown regions.
+    """
+    return [(region, distance) for region, distance in REGION_DISTANCES[origin] if distance <= radius_km]
@@ -0,0 +1,38 @@
+from chat.notifications import notify_users
+from .models import SavedSearch, SavedSearchMatch
+from .serializers import AdSerializer
+
+
+def matching_saved_searches(ad):
+    """
+    Returns the saved searches (of other users) that match a new ad.
+
+    Candidates are fetched through the inverted index with the ad's own keys, so
+    the work is proportional to the subscriptions on the ad's category, location
+    and type rather than to the total number of saved searches.
+    """
+    keys = ['*', f'category:{ad.category}', f'location:{ad.location}', f'type:{ad.type}']
+    candidates = SavedSearch.objects.filter(keys__key__in=keys).exclude(user_id=ad.owned_by_id).distinct()
+    return [saved_search for saved_search in candidates if saved_search.matches_ad(ad)]
+
+
+def notify_saved_searches(ad, context=None):
+    """
+    Records the matches for a newly created ad and pushes a `saved_search.match`
+    event to each subscriber's open chat sockets. Returns the matched searches.
+    """
+    matches = matching_saved_searches(ad)
+    if not matches:
+        return matches
+
+    SavedSearchMatch.objects.bulk_create(
+        [SavedSearchMatch(saved_search=saved_search, ad=ad) for saved_search in matches], ignore_conflicts=True
+    )
+    ad_data = AdSerializer(ad, context=context or {}).data
+    for saved_search in matches:
+        notify_users([saved_search.user_id], 'saved_search.match', {
+            'saved_search': saved_search.pk,
+            'name': saved_search.name,
+            'ad': ad_data,
+        })
+    return matches
@@ -1,6 +1,17 @@
+import logging
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.fields import ListField
-from .models import Ad, AdImage, AdReport
+from core.exceptions import PreconditionFailed
+from .facets import invalidate_facets
+from .models import Ad, AdImage, AdReport, SavedSearch
+from .tasks import stage_ad_images
+from tasks.registry import enqueue
+
+logger = logging.getLogger(__name__)
 
 
 class AdImageSerializer(serializers.ModelSerializer): # Serializer for the AdImage model.
@@ -23,7 +34,7 @@ class AdSerializer(serializers.ModelSerializer): # Serializer for the Ad model.
 
     class Meta:
         model = Ad
-        fields = ['id', 'title', 'description', 'category', 'type', 'location', 'price', 'created_at', 'owned_by', 'owned_by_id', 'owned_by_profile_picture', 'images', 'status']
+        fields = ['id', 'title', 'description', 'category', 'type', 'location', 'price', 'created_at', 'version', 'owned_by', 'owned_by_id', 'owned_by_profile_picture', 'images', 'status']
 
     def get_owned_by(self, obj): # Get the username of the owner of the ad.
 
@@ -61,51 +72,72 @@ class AdFormSerializer(serializers.ModelSerializer): # Serializer for the Ad mod
         required=False,
         write_only=True
     )
+    images_to_keep = ListField(
+        child=serializers.IntegerField(),
+        required=False,
+        write_only=True
+    )
 
     class Meta:
         model = Ad
-        fields = ('title', 'description', 'price', 'type', 'category', 'location', 'images', 'status')
+        fields = ('title', 'description', 'price', 'type', 'category', 'location', 'images', 'images_to_keep', 'status', 'version')
+        read_only_fields = ('version',)
         extra_kwargs = {
             'images': {'required': False},
         }
 
     def create(self, validated_data): # Create a new ad instance with the provided validated data.
         images_data = validated_data.pop('images', [])
+        validated_data.pop('images_to_keep', None)
         ad = Ad.objects.create(**validated_data)
 
-        for image_file in images_data:
-            AdImage.objects.create(ad=ad, image=image_file)
+        # Image files are written by the background worker
+        stage_ad_images(ad, images_data)
 
         return ad
     
-    def update(self, instance, validated_data): # Update an existing ad instance with the provided validated data.
-        # Debug: Print validated data
-        print("Validated data:", validated_data)
-
-        # Debug: Print raw request data
-        print("Raw request data:", self.context['request'].data)
-
-        # Update basic ad fields
-        instance.title = validated_data.get('title', instance.title)
-        instance.description = validated_data.get('description', instance.description)
-        instance.price = validated_data.get('price', instance.price)
-        instance.type = validated_data.get('type', instance.price)
-        instance.category = validated_data.get('category', instance.price)
-        instance.location = validated_data.get('location', instance.price)
-        # etc. for other fields
-        instance.save()
-
-        # Image handling
+    def update(self, instance, validated_data): # Apply an edit atomically, writing only what changed.
+        """
+        Applies an edit in one transaction guarded by the ad's version.
+
+        Changed fields are written with a conditional UPDATE that also bumps the
+        version, so an edit based on a stale version (context['expected_version'])
+        raises PreconditionFailed instead of overwriting the other change. Images are
+        reconciled as a diff against `images_to_keep`: only removed images are deleted
+        (in one statement) and only new uploads are staged.
+        """
+        logger.debug("Updating ad %s with %s", instance.pk, validated_data)
+        expected_version = self.context.get('expected_version')
         images_data = validated_data.pop('images', [])
-        images_to_keep = self.context['request'].data.getlist('images_to_keep', [])
-        
-        # Delete images not in images_to_keep_ids
-        instance.images.exclude(id__in=images_to_keep).delete()
-
-        # Add new images
-        for image_file in images_data:
-            AdImage.objects.create(ad=instance, image=image_file)
-
+        images_to_keep = set(validated_data.pop('images_to_keep', []))
+        changes = {field: value for field, value in validated_data.items() if getattr(instance, field) != value}
+
+        with transaction.atomic():
+            current_images = dict(instance.images.order_by().values_list('id', 'image'))
+            removed_ids = current_images.keys() - images_to_keep
+
+            if changes or removed_ids or images_data:
+                ads = Ad.objects.filter(pk=instance.pk)
+                if expected_version is not None:
+                    ads = ads.filter(version=expected_version)
+                if not ads.update(**changes, version=F('version') + 1, updated_at=timezone.now()):
+                    raise PreconditionFailed()
+                # A queryset update sends no post_save, so drop the cached facet counts here
+                transaction.on_commit(invalidate_facets)
+            elif expected_version is not None and expected_version != instance.version:
+                raise PreconditionFailed()
+
+            if removed_ids:
+                AdImage.objects.filter(id__in=removed_ids).delete()
+                # Their files are removed in the background
+                enqueue('ads.delete_image_files', names=[str(current_images[image_id]) for image_id in removed_ids])
+
+            stage_ad_images(instance, images_data)
+
+        if changes or removed_ids or images_data:
+            for field, value in changes.items():
+                setattr(instance, field, value)
+            instance.refresh_from_db(fields=['version', 'updated_at'])
         return instance
 
 
@@ -126,3 +158,23 @@ class AdReportSerializer(serializers.ModelSerializer): # Serializer for the AdRe
             validated_data['other_details'] = ''
         ad_report = AdReport.objects.create(**validated_data)
         return ad_report
+
+
+class SavedSearchSerializer(serializers.ModelSerializer): # Serializer for the SavedSearch model.
+    MAX_PER_USER = 20
+
+    class Meta:
+        model = SavedSearch
+        fields = ['id', 'name', 'category', 'type', 'location', 'near', 'radius', 'min_price', 'max_price', 'created_at']
+        read_only_fields = ['id', 'created_at']
+
+    def validate(self, attrs): # Enforce the per-user limit and a sensible price range.
+        user = self.context['request'].user
+        if self.instance is None and user.saved_searches.count() >= self.MAX_PER_USER:
+            raise serializers.ValidationError(f'You can save at most {self.MAX_PER_USER} searches.')
+        min_price, max_price = attrs.get('min_price'), attrs.get('max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise serializers.ValidationError({'max_price': 'Must be greater than or equal to min_price.'})
+        if attrs.get('radius') is not None and not attrs.get('near'):
+            raise serializers.ValidationError({'near': 'A region is required when a radius is given.'})
+        return attrs
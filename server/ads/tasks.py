@@ -0,0 +1,70 @@
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+
+from tasks.registry import enqueue, task
+from .models import Ad, AdImage, AdReport
+
+# Uploads are written here during the request and moved into media storage by the worker
+staging_storage = FileSystemStorage(location=settings.UPLOAD_STAGING_ROOT)
+
+
+def stage_ad_images(ad, image_files):
+    """
+    Stages uploaded images for `ad` and queues one `ads.attach_image` task per file,
+    so hashing, writing and registering the images happens outside the request.
+
+    Files are staged under a random name: the client's file name is freed again once
+    an upload is attached, so it cannot identify the upload or its task.
+    """
+    for image_file in image_files:
+        extension = posixpath.splitext(image_file.name)[1].lower()
+        staged_name = staging_storage.save(uuid.uuid4().hex + extension, image_file)
+        enqueue('ads.attach_image', idempotency_key=f'attach-image:{ad.pk}:{staged_name}', ad_id=ad.pk, staged_name=staged_name)
+
+
+@task('ads.attach_image', max_attempts=5)
+def attach_image(ad_id, staged_name): # Move a staged upload into media storage and add it to the ad
+    if not staging_storage.exists(staged_name):
+        return  # Already attached by an earlier attempt
+
+    if Ad.objects.filter(pk=ad_id).exists():
+        upload_to = AdImage._meta.get_field('image').upload_to
+        with staging_storage.open(staged_name) as staged_file:
+            name = default_storage.save(posixpath.join(upload_to, posixpath.basename(staged_name)), File(staged_file))
+        AdImage.objects.get_or_create(ad_id=ad_id, image=name)
+    staging_storage.delete(staged_name)
+
+
+@task('ads.delete_image_files')
+def delete_image_files(names):
+    """
+    Deletes image files whose AdImage rows were removed. Files are shared by
+    identical uploads (content hashed names), so only unreferenced ones are deleted.
+    """
+    referenced = set(AdImage.objects.filter(image__in=names).order_by().values_list('image', flat=True))
+    for name in set(names) - referenced:
+        default_storage.delete(name)
+
+
+@task('ads.create_report')
+def create_report(ad_id, report_reason, other_details='', reported_by_id=None): # Store a report submitted for an ad
+    if Ad.objects.filter(pk=ad_id).exists():
+        AdReport.objects.create(
+            ad_id=ad_id,
+            reported_by_id=reported_by_id,
+            report_reason=report_reason,
+            other_details=other_details,
+        )
+
+
+@task('ads.notify_saved_searches')
+def notify_saved_searches(ad_id): # Match a new ad against saved searches and notify the subscribers
+    from .saved_searches import notify_saved_searches
+
+    ad = Ad.objects.select_related('owned_by').prefetch_related('images').filter(pk=ad_id).first()
+    if ad is not None:
+        notify_saved_searches(ad)
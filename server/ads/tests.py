@@ -1,3 +1,220 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Sum
+from django.test import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from users.models import CustomUser
+from .models import Ad, AdReport, AdViewCount, SavedSearch
+from .saved_searches import matching_saved_searches
+from .trending import compute_trending, view_buffer
+from . import tasks
+
+
+class AdTestCase(APITestCase): # Shared fixtures: a user with an API token and one of their ads
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='Password123!')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.ad = Ad.objects.create(title='Calculus', description='Used textbook', category='TB', owned_by=self.user)
+
+
+class EditAdTests(AdTestCase):
+    def edit(self, **data):
+        return self.client.put('/api/ads/edit/', {'pk': self.ad.pk, 'title': self.ad.title,
+                                                  'description': self.ad.description, **data})
+
+    def test_edit_bumps_version(self):
+        response = self.edit(category='EL', version=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"2"')
+        self.ad.refresh_from_db()
+        self.assertEqual((self.ad.category, self.ad.version), ('EL', 2))
+
+    def test_stale_version_is_rejected(self):
+        self.assertEqual(self.edit(category='EL', version=1).status_code, 200)
+        response = self.edit(category='GA', version=1)
+        self.assertEqual(response.status_code, 412)
+        self.ad.refresh_from_db()
+        self.assertEqual((self.ad.category, self.ad.version), ('EL', 2))
+
+    def test_edit_invalidates_facets(self):
+        counts = lambda: {item['value']: item['count'] for item in self.client.get('/api/ads/facets/').data['category']}
+        self.assertEqual((counts()['TB'], counts()['EL']), (1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.edit(category='EL', version=1).status_code, 200)
+        self.assertEqual((counts()['TB'], counts()['EL']), (0, 1))
+
+
+class SavedSearchIndexTests(AdTestCase):
+    def keys(self, saved_search):
+        return sorted(saved_search.keys.values_list('key', flat=True))
+
+    def test_admin_saves_rebuild_keys(self):
+        admin = CustomUser.objects.create_superuser(username='admin', email='admin@example.com', password='Password123!')
+        self.client.force_login(admin)
+        response = self.client.post('/api/admin/ads/savedsearch/add/', {'user': admin.pk, 'category': 'TB'})
+        self.assertEqual(response.status_code, 302)
+        saved_search = SavedSearch.objects.get()
+        self.assertEqual(self.keys(saved_search), ['category:TB'])
+        self.assertEqual(list(matching_saved_searches(self.ad)), [saved_search])
+
+        response = self.client.post(f'/api/admin/ads/savedsearch/{saved_search.pk}/change/', {'user': admin.pk, 'type': 'IS'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.keys(saved_search), ['type:IS'])
+        self.assertEqual(list(matching_saved_searches(self.ad)), [])
+
+    def test_api_create_indexes_search(self):
+        response = self.client.post('/api/ads/saved-searches/', {'location': 'TE'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.keys(SavedSearch.objects.get(pk=response.data['id'])), ['location:TE'])
+
+
+class AdFilterTests(AdTestCase):
+    def test_invalid_price_is_rejected(self):
+        for path in ('/api/ads/facets/', '/api/ads/'):
+            for params in ({'min_price': 'abc'}, {'max_price': 'NaN'}):
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, 400, (path, params))
+                self.assertIn(next(iter(params)), response.data)
+
+    def test_price_filter(self):
+        Ad.objects.create(title='Desk', description='Oak desk', category='FA', price='80.00', owned_by=self.user)
+        response = self.client.get('/api/ads/facets/', {'min_price': '50', 'max_price': '100'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total'], 1)
+
+
+class AdReportTests(AdTestCase):
+    def report(self, user, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get_or_create(user=user)[0].key}')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/ads/report/{self.ad.pk}/', {'report_reason': 'SPAM'}, format='json',
+                                    HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_with_the_same_key_file_one_report(self):
+        reporter = CustomUser.objects.create_user(username='reporter', email='reporter@example.com')
+        self.assertEqual(self.report(reporter, 'abc').status_code, 202)
+        self.assertEqual(self.report(reporter, 'abc').status_code, 202)
+        self.assertEqual(AdReport.objects.filter(reported_by=reporter).count(), 1)
+
+    def test_same_key_from_different_users_is_not_merged(self):
+        for username in ('first', 'second'):
+            reporter = CustomUser.objects.create_user(username=username, email=f'{username}@example.com')
+            self.assertEqual(self.report(reporter, 'abc').status_code, 202)
+        self.assertEqual(AdReport.objects.filter(ad=self.ad).count(), 2)
+
+    def test_overlong_key_is_rejected(self):
+        response = self.report(self.user, 'x' * 201)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AdReport.objects.exists())
+
+
+@override_settings(TASKS_ALWAYS_EAGER=True)
+class AdImageUploadTests(AdTestCase):
+    def setUp(self):
+        super().setUp()
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self.staging = FileSystemStorage(location=f'{root}/staging')
+        patcher = mock.patch.object(tasks, 'staging_storage', self.staging)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        media = self.settings(MEDIA_ROOT=f'{root}/media')
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, colour):
+        image = io.BytesIO()
+        Image.new('RGB', (8, 8), colour).save(image, format='JPEG')
+        image.seek(0)
+        image.name = 'image.jpg'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/ads/create/', {
+                'title': 'Lamp', 'description': 'Desk lamp', 'type': 'IS', 'category': 'FA', 'location': 'TE',
+                'images': [image],
+            })
+        self.assertEqual(response.status_code, 201)
+        return Ad.objects.latest('pk')
+
+    def test_uploads_with_the_same_file_name_are_all_attached(self):
+        first, second = self.upload((255, 0, 0)), self.upload((0, 0, 255))
+        self.assertEqual((first.images.count(), second.images.count()), (1, 1))
+        self.assertNotEqual(first.images.get().image.name, second.images.get().image.name)
+        self.assertEqual(self.staging.listdir('')[1], [])
+
+class AdListTests(AdTestCase):
+    def setUp(self):
+        super().setUp()
+        self.ads = [self.ad] + [
+            Ad.objects.create(title=f'Ad {location}', description='Listed', location=location, owned_by=self.user)
+            for location in ('EB', 'OS', 'TE')
+        ]
+
+    def test_ids_lookup_is_one_query_per_relation(self):
+        ids = ','.join(str(ad.pk) for ad in self.ads)
+        with self.assertNumQueries(3):  # Token, ads joined with their owners, then their images
+            response = self.client.get('/api/ads/', {'ids': f'{ids},{ids},abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(ad['id'] for ad in response.data), sorted(ad.pk for ad in self.ads))
+
+    def test_ids_lookup_skips_deleted_ads(self):
+        Ad.objects.filter(pk=self.ad.pk).update(status='DE')
+        response = self.client.get('/api/ads/', {'ids': ','.join(str(ad.pk) for ad in self.ads)})
+        self.assertEqual(sorted(ad['id'] for ad in response.data), sorted(ad.pk for ad in self.ads[1:]))
+
+    def test_list_query_count_does_not_grow_with_results(self):
+        for index in range(10):
+            Ad.objects.create(title=f'More {index}', description='Listed', owned_by=self.user)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/ads/')
+        self.assertEqual(len(response.data), len(self.ads) + 10)
+
+    def test_near_orders_by_distance_and_excludes_far_regions(self):
+        response = self.client.get('/api/ads/', {'near': 'TE', 'radius': '20'})
+        self.assertEqual(response.status_code, 200)
+        locations = [ad['location'] for ad in response.data]
+        self.assertEqual(locations, ['Toronto & East York', 'Toronto & East York', 'Etobicoke'])
+        self.assertEqual(self.client.get('/api/ads/', {'near': 'XX'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/ads/', {'near': 'TE', 'radius': 'far'}).status_code, 400)
+
+
+class TrendingTests(AdTestCase):
+    def test_views_rank_trending_ads(self):
+        viewer = CustomUser.objects.create_user(username='viewer', email='viewer@example.com')
+        popular = Ad.objects.create(title='Bike', description='Road bike', category='SP', owned_by=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=viewer).key}')
+        for ad in (popular, popular, self.ad):
+            self.assertEqual(self.client.get(f'/api/ads/{ad.pk}/').status_code, 200)
+        owner_client = self.client_class()
+        owner_client.credentials(HTTP_AUTHORIZATION=f'Token {self.user.auth_token.key}')
+        owner_client.get(f'/api/ads/{popular.pk}/')  # Owners viewing their own ads do not count
+        view_buffer.flush()
+        self.assertEqual(AdViewCount.objects.filter(ad=popular).aggregate(total=Sum('views'))['total'], 2)
+
+        compute_trending()
+        response = self.client.get('/api/ads/trending/')
+        self.assertEqual([ad['id'] for ad in response.data], [popular.pk, self.ad.pk])
+
+        stranger = CustomUser.objects.create_user(username='stranger', email='stranger@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=stranger).key}')
+        self.assertEqual([ad['id'] for ad in self.client.get('/api/ads/recommended/').data], [popular.pk, self.ad.pk])
+
+    def test_flush_drops_views_of_deleted_rows(self):
+        viewer = CustomUser.objects.create_user(username='viewer', email='viewer@example.com')
+        gone = Ad.objects.create(title='Bike', description='Road bike', category='SP', owned_by=self.user)
+        view_buffer.add(self.ad.pk, viewer.pk)
+        view_buffer.add(self.ad.pk)
+        view_buffer.add(gone.pk)
+        view_buffer.add(self.ad.pk, self.user.pk + 1000)
+        gone.delete()
+        view_buffer.flush()
+        self.assertEqual(sorted(AdViewCount.objects.values_list('ad_id', 'viewer_id'), key=str),
+                         sorted([(self.ad.pk, viewer.pk), (self.ad.pk, None)], key=str))
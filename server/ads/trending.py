@@ -0,0 +1,236 @@
+import atexit
+import bisect
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from chat.models import Message
+from users.models import CustomUser
+from .facets import PRICE_BUCKETS
+from .models import Ad, AdViewCount, Recommendation, TrendingAd
+
+logger = logging.getLogger(__name__)
+
+
+class ViewBuffer:
+    """
+    Counts ad detail views in memory and writes them in one bulk INSERT once
+    `max_keys` distinct (ad, viewer) pairs are pending or `interval` seconds have
+    passed, so serving an ad does not cost a database write per view.
+    """
+
+    def __init__(self, max_keys, interval):
+        self.max_keys = max_keys
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.last_flush = time.monotonic()
+
+    def add(self, ad_id, viewer_id=None): # Count a view, flushing the buffer when it is due
+        with self.lock:
+            self.counts[(ad_id, viewer_id)] += 1
+            if len(self.counts) < self.max_keys and time.monotonic() - self.last_flush < self.interval:
+                return
+            pending = self.swap()
+        self.write(pending)
+
+    def flush(self): # Write all pending views now
+        with self.lock:
+            pending = self.swap()
+        self.write(pending)
+
+    def swap(self): # Take the pending counts and start a new batch (caller holds the lock)
+        pending, self.counts = self.counts, Counter()
+        self.last_flush = time.monotonic()
+        return pending
+
+    def write(self, pending):
+        """
+        Inserts the pending counts. The flush runs inside whichever request filled the
+        buffer, so views of ads or by users deleted in the meantime are dropped rather
+        than failing that request with a foreign key error.
+        """
+        if not pending:
+            return
+        ad_ids = existing_ids(Ad, {ad_id for ad_id, _ in pending})
+        viewer_ids = existing_ids(CustomUser, {viewer_id for _, viewer_id in pending if viewer_id is not None})
+        period = timezone.now().replace(minute=0, second=0, microsecond=0)
+        rows = [
+            AdViewCount(ad_id=ad_id, viewer_id=viewer_id, period=period, views=views)
+            for (ad_id, viewer_id), views in pending.items()
+            if ad_id in ad_ids and (viewer_id is None or viewer_id in viewer_ids)
+        ]
+        try:
+            with transaction.atomic():
+                AdViewCount.objects.bulk_create(rows, batch_size=500)
+        except IntegrityError:  # Deleted between the check above and the insert
+            logger.exception('Dropped %d buffered ad view counts', len(rows))
+
+
+view_buffer = ViewBuffer(settings.AD_VIEW_BUFFER_SIZE, settings.AD_VIEW_FLUSH_INTERVAL)
+atexit.register(view_buffer.flush)
+
+
+def record_view(ad, user): # Record a view of `ad` unless it is the owner looking at their own ad
+    if user.is_authenticated and user.pk == ad.owned_by_id:
+        return
+    view_buffer.add(ad.pk, user.pk if user.is_authenticated else None)
+
+
+def existing_ids(model, ids): # The subset of `ids` that still exist as `model` rows
+    existing = set()
+    for chunk in chunked(ids):
+        existing.update(model.objects.filter(pk__in=chunk).values_list('pk', flat=True))
+    return existing
+
+
+def price_band(price): # Index of the facet price bucket `price` falls in (None for unpriced ads)
+    if price is None:
+        return None
+    return bisect.bisect_right(PRICE_BUCKETS, price) - 1
+
+
+def chunked(values, size=500):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def decay(at, now): # Weight of a signal at time `at`, halving every TRENDING_HALF_LIFE_HOURS
+    age_hours = (now - at).total_seconds() / 3600
+    return 0.5 ** (age_hours / settings.TRENDING_HALF_LIFE_HOURS)
+
+
+def contacted_ads(since):
+    """
+    Yields (buyer_id, ad_id, contacted_at) for the chat threads started since `since`.
+
+    Messages carry no ad, so a thread is attributed to the seller's most recent ad
+    created before the first message of the thread; the user who sent that first
+    message is the buyer.
+    """
+    threads = {}
+    messages = Message.objects.filter(timestamp__gte=since).order_by('timestamp') \
+        .values_list('sender_id', 'receiver_id', 'timestamp')
+    for sender_id, receiver_id, timestamp in messages.iterator(chunk_size=2000):
+        threads.setdefault(frozenset((sender_id, receiver_id)), (sender_id, receiver_id, timestamp))
+
+    sellers = {receiver_id for _, receiver_id, _ in threads.values()}
+    ads_by_seller = defaultdict(list)
+    for seller_ids in chunked(sellers):
+        ads = Ad.objects.filter(owned_by_id__in=seller_ids).exclude(status='DE').order_by('created_at') \
+            .values_list('owned_by_id', 'created_at', 'id')
+        for owner_id, created_at, ad_id in ads:
+            ads_by_seller[owner_id].append((created_at, ad_id))
+
+    for buyer_id, seller_id, contacted_at in threads.values():
+        seller_ads = ads_by_seller.get(seller_id, [])
+        position = bisect.bisect_right(seller_ads, (contacted_at, float('inf')))
+        if position:
+            yield buyer_id, seller_ads[position - 1][1], contacted_at
+
+
+def compute_trending(now=None):
+    """
+    Rebuilds the TrendingAd and Recommendation tables from the view and contact
+    signals of the last TRENDING_WINDOW_DAYS and returns (trending, recommendations)
+    row counts.
+
+    Trending score: time decayed views plus TRENDING_CONTACT_WEIGHT per started chat.
+    Recommendations: every ad is reduced to a (category, location, price band)
+    feature; two features co-occur when the same user showed interest in both.
+    A user's features are expanded through these co-occurrence counts, and the
+    best trending ads of the resulting features (that the user does not own and
+    has not interacted with yet) become their recommendations.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+    contact_weight = settings.TRENDING_CONTACT_WEIGHT
+
+    scores, views, contacts = Counter(), Counter(), Counter()
+    interests = defaultdict(Counter) # user id -> ad id -> interest weight
+
+    view_rows = AdViewCount.objects.filter(period__gte=since).values('ad_id', 'viewer_id', 'period') \
+        .annotate(total=Sum('views')).order_by().values_list('ad_id', 'viewer_id', 'period', 'total')
+    for ad_id, viewer_id, period, total in view_rows.iterator(chunk_size=2000):
+        scores[ad_id] += total * decay(period, now)
+        views[ad_id] += total
+        if viewer_id is not None:
+            interests[viewer_id][ad_id] += total
+
+    for buyer_id, ad_id, contacted_at in contacted_ads(since):
+        scores[ad_id] += contact_weight * decay(contacted_at, now)
+        contacts[ad_id] += 1
+        interests[buyer_id][ad_id] += contact_weight
+
+    # Only ads that are still for sale can trend or be recommended
+    live = {}
+    for ad_ids in chunked(scores):
+        for ad_id, owner_id, category, location, price in Ad.objects.filter(id__in=ad_ids, status='NS') \
+                .values_list('id', 'owned_by_id', 'category', 'location', 'price'):
+            live[ad_id] = (owner_id, (category, location, price_band(price)))
+
+    ranked = sorted((ad_id for ad_id in live), key=lambda ad_id: scores[ad_id], reverse=True)
+    trending = [
+        TrendingAd(ad_id=ad_id, score=scores[ad_id], views=views[ad_id], contacts=contacts[ad_id], computed_at=now)
+        for ad_id in ranked[:settings.TRENDING_SIZE]
+    ]
+
+    top_by_feature = defaultdict(list) # feature -> its ads, best trending first
+    for ad_id in ranked:
+        top_by_feature[live[ad_id][1]].append(ad_id)
+
+    user_features = {}
+    for user_id, ads in interests.items():
+        features = Counter()
+        for ad_id, weight in ads.items():
+            if ad_id in live:
+                features[live[ad_id][1]] += weight
+        if features:
+            user_features[user_id] = dict(features.most_common(settings.RECOMMENDATION_PROFILE_SIZE))
+
+    cooccurrence = defaultdict(Counter)
+    for features in user_features.values():
+        for feature in features:
+            for other in features:
+                cooccurrence[feature][other] += 1
+
+    recommendations = []
+    per_user = settings.RECOMMENDATIONS_PER_USER
+    for user_id, features in user_features.items():
+        related = Counter()
+        for feature, weight in features.items():
+            for other, count in cooccurrence[feature].items():
+                related[other] += weight * count
+
+        candidates = Counter()
+        for feature, affinity in related.most_common(per_user):
+            picked = 0
+            for ad_id in top_by_feature[feature]:
+                if live[ad_id][0] == user_id or ad_id in interests[user_id]:
+                    continue
+                candidates[ad_id] = max(candidates[ad_id], affinity * scores[ad_id])
+                picked += 1
+                if picked == per_user:
+                    break
+
+        recommendations.extend(
+            Recommendation(user_id=user_id, ad_id=ad_id, rank=rank, score=score)
+            for rank, (ad_id, score) in enumerate(candidates.most_common(per_user))
+        )
+
+    with transaction.atomic():
+        TrendingAd.objects.all().delete()
+        TrendingAd.objects.bulk_create(trending, batch_size=1000)
+        Recommendation.objects.all().delete()
+        Recommendation.objects.bulk_create(recommendations, batch_size=1000)
+        AdViewCount.objects.filter(period__lt=since).delete()
+
+    return len(trending), len(recommendations)
@@ -1,15 +1,21 @@
 from django.contrib import admin
 from django.urls import path, re_path
-from .views import AdListView, AdDetailView, CreateAdView, EditAdView, DeleteAdView, CreateAdReportView
+from .views import AdListView, AdFacetsView, AdDetailView, CreateAdView, EditAdView, DeleteAdView, CreateAdReportView, SavedSearchListView, SavedSearchDeleteView, SavedSearchMatchesView, TrendingAdsView, RecommendedAdsView
 
 # Define the URL patterns for the ads app
 urlpatterns = [
     path('', AdListView.as_view(), name='ad-list'),  # URL pattern for the ad list view
+    path('facets/', AdFacetsView.as_view(), name='ad-facets'),  # URL pattern for the browse filter facet counts
+    path('trending/', TrendingAdsView.as_view(), name='ad-trending'),  # URL pattern for trending ads
+    path('recommended/', RecommendedAdsView.as_view(), name='ad-recommended'),  # URL pattern for the user's recommended ads
     path('<int:pk>/', AdDetailView.as_view(), name='ad-detail'),  # URL pattern for the ad detail view
     path('create/', CreateAdView.as_view(), name='create_ad'),  # URL pattern for creating a new ad
     path('edit/', EditAdView.as_view(), name='edit-ad'),  # URL pattern for editing an existing ad
     path('delete/', DeleteAdView.as_view(), name='delete-ad'),  # URL pattern for deleting an ad
     path('report/<int:pk>/', CreateAdReportView.as_view(), name='ad-report'),  # URL pattern for reporting an ad
+    path('saved-searches/', SavedSearchListView.as_view(), name='saved-search-list'),  # URL pattern for listing and saving searches
+    path('saved-searches/<int:pk>/', SavedSearchDeleteView.as_view(), name='saved-search-delete'),  # URL pattern for deleting a saved search
+    path('saved-searches/matches/', SavedSearchMatchesView.as_view(), name='saved-search-matches'),  # URL pattern for ads matching saved searches
     #re_path('create-ad', createAd),  # Example of using a regular expression in URL pattern
     #re_path('edit-ad', editAd),  # Example of using a regular expression in URL pattern
 ]
\ No newline at end of file
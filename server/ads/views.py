@@ -1,17 +1,24 @@
-from rest_framework.generics import ListAPIView, RetrieveAPIView
+from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveAPIView, DestroyAPIView
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from .models import Ad
-from .serializers import AdSerializer, AdImageSerializer, AdFormSerializer, AdDeleteSerializer, AdReportSerializer
+from rest_framework.exceptions import ValidationError
+from .models import Ad, SavedSearch
+from .serializers import AdSerializer, AdImageSerializer, AdFormSerializer, AdDeleteSerializer, AdReportSerializer, SavedSearchSerializer
 from users.models import CustomUser
 from rest_framework.decorators import authentication_classes, permission_classes, parser_classes
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.shortcuts import get_object_or_404
+from django.db.models import Case, FloatField, Max, Value, When
+from core.utils import parse_id_list
+from .facets import get_facets
+from .filters import build_ad_filters, nearby_regions
+from .trending import record_view
+from tasks.registry import enqueue
 
 class AdListView(ListAPIView):
     # API view for retrieving a list of ads based on filters.
@@ -19,35 +26,71 @@ class AdListView(ListAPIView):
 
     def get_queryset(self):
         # Get the queryset of ads based on the provided filters.
-        queryset = Ad.objects.all()
-        category = self.request.query_params.get('category')
-        location = self.request.query_params.get('location')
-        status = self.request.query_params.get('status')
-        min_price = self.request.query_params.get('min_price', None)
-        max_price = self.request.query_params.get('max_price', None)
+        # The owner is joined and images prefetched so serialization issues a fixed number of queries.
+        # 'deleted' ads are excluded from every variant of the list, including id lookups.
+        queryset = Ad.objects.exclude(status='DE').select_related('owned_by').prefetch_related('images')
+
+        # Batch hydration: `?ids=1,2,3` resolves a bounded set of ads in one query
+        ids = parse_id_list(self.request.query_params.get('ids'))
+        if ids is not None:
+            return queryset.filter(id__in=ids)
+
+        filters = build_ad_filters(self.request.query_params)
+        for condition in filters.values():
+            queryset = queryset.filter(condition)
+
+        near = self.request.query_params.get('near')
+        if near is not None:
+            # Order by distance to `near` (a CASE over the handful of matching regions from the
+            # precomputed distance table), then by recency.
+            nearby = nearby_regions(near, self.request.query_params.get('radius'))
+            distance = Case(
+                *[When(location=region, then=Value(distance_km)) for region, distance_km in nearby],
+                output_field=FloatField(),
+            )
+            queryset = queryset.annotate(distance_km=distance).order_by('distance_km', '-created_at')
+
+        return queryset
+
+class AdFacetsView(APIView):
+    # API view for the per-value counts shown next to the browse filters.
+
+    def get(self, request, *args, **kwargs):
+        # Return facet counts conditioned on the same filters /api/ads/ accepts.
+        return Response(get_facets(request.query_params))
 
-        if category is not None:
-            queryset = queryset.filter(category=category)
-
-        if location is not None:
-            queryset = queryset.filter(location=location)
-
-        if status is not None:
-            queryset = queryset.filter(status=status)
+class AdDetailView(RetrieveAPIView):
+    # API view for retrieving a single ad.
+    queryset = Ad.objects.select_related('owned_by').prefetch_related('images')
+    serializer_class = AdSerializer
 
-        if min_price is not None:
-            queryset = queryset.filter(price__gte=min_price)
+    def retrieve(self, request, *args, **kwargs):
+        # Count the view for trending (buffered in memory, see ads.trending) and return the ad.
+        ad = self.get_object()
+        record_view(ad, request.user)
+        return Response(self.get_serializer(ad).data)
 
-        if max_price is not None:
-            queryset = queryset.filter(price__lte=max_price)
+class TrendingAdsView(ListAPIView):
+    # API view for the ads with the highest precomputed trending score.
+    serializer_class = AdSerializer
 
-        # Exclude 'deleted' datasets in the final queryset
-        return queryset.exclude(status='DE')
+    def get_queryset(self):
+        return Ad.objects.filter(trending__isnull=False, status='NS').select_related('owned_by') \
+            .prefetch_related('images').order_by('-trending__score')[:50]
 
-class AdDetailView(RetrieveAPIView):
-    # API view for retrieving a single ad.
-    queryset = Ad.objects.all()
+class RecommendedAdsView(ListAPIView):
+    # API view for the current user's precomputed "similar ads"; trending ads until they have any.
     serializer_class = AdSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        recommended = Ad.objects.filter(recommendations__user=self.request.user, status='NS') \
+            .select_related('owned_by').prefetch_related('images').order_by('recommendations__rank')
+        if recommended.exists():
+            return recommended
+        return Ad.objects.filter(trending__isnull=False, status='NS').exclude(owned_by=self.request.user) \
+            .select_related('owned_by').prefetch_related('images').order_by('-trending__score')[:20]
 
 class CreateAdView(APIView):
     # API view for creating a new ad.
@@ -60,10 +103,25 @@ class CreateAdView(APIView):
         serializer = AdFormSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             ad = serializer.save(owned_by=request.user)
+            # Notify users whose saved searches match the new ad
+            enqueue('ads.notify_saved_searches', idempotency_key=f'saved-search-match:{ad.pk}', ad_id=ad.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def requested_version(request):
+    """
+    Returns the ad version a conditional edit is based on, taken from the If-Match
+    header (ETag `"<version>"`) or the `version` form field, or None if neither is sent.
+    """
+    raw = request.headers.get('If-Match') or request.data.get('version')
+    if raw in (None, ''):
+        return None
+    raw = str(raw).removeprefix('W/').strip('"')
+    if not raw.isdigit():
+        raise ValidationError({'version': 'Must be an integer.'})
+    return int(raw)
+
 class EditAdView(APIView):
     # API view for editing an existing ad.
     parser_classes = (MultiPartParser, FormParser)
@@ -71,12 +129,18 @@ class EditAdView(APIView):
     permission_classes = [IsAuthenticated]
 
     def put(self, request, *args, **kwargs):
-        # Update an existing ad based on the provided form data.
-        ad = Ad.objects.get(pk=request.data["pk"])   
-        adSerializer = AdFormSerializer(ad, data=request.data, context={'request': request})
+        # Update one of the user's ads based on the provided form data.
+        # The ad version the client edited (`version` field or If-Match header) must still be current, else 412.
+        pk, expected_version = request.data.get("pk"), requested_version(request)
+        if not str(pk).isdigit():
+            return Response({'pk': 'A valid ad id is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        ad = get_object_or_404(Ad, pk=pk, owned_by=request.user)
+        adSerializer = AdFormSerializer(ad, data=request.data, context={'request': request, 'expected_version': expected_version})
         if adSerializer.is_valid():
             adSerializer.save()
-            return Response(adSerializer.data, status=status.HTTP_201_CREATED)
+            response = Response(adSerializer.data, status=status.HTTP_200_OK)
+            response['ETag'] = f'"{ad.version}"'
+            return response
         return Response(adSerializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 class DeleteAdView(APIView):
@@ -97,6 +161,7 @@ class DeleteAdView(APIView):
 class CreateAdReportView(APIView):
     # API view for creating a report for an ad.
     parser_classes = [JSONParser]
+    max_idempotency_key_length = 100  # Leaves room for the ad and reporter ids within Task.idempotency_key
 
     def post(self, request, *args, **kwargs):
         # Create a report for an ad based on the provided data.
@@ -106,6 +171,11 @@ class CreateAdReportView(APIView):
         # Retrieve the ad instance associated with the provided ID or return a 404 error if not found
         ad = get_object_or_404(Ad, pk=ad_id)
 
+        client_key = request.headers.get('Idempotency-Key')
+        if client_key is not None and not 0 < len(client_key) <= self.max_idempotency_key_length:
+            return Response({'Idempotency-Key': f'Must be 1 to {self.max_idempotency_key_length} characters.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
         # Update the request data with the ad instance
         request.data.update({'ad': ad.pk})
 
@@ -113,12 +183,50 @@ class CreateAdReportView(APIView):
         serializer = AdReportSerializer(data=request.data)
 
         if serializer.is_valid():
-            # Save the report, associating it with the retrieved ad and the authenticated user (if any)
-            if request.user.is_authenticated:
-                serializer.save(reported_by=request.user, ad=ad)
-            else:
-                serializer.save(ad=ad)
-
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            # Queue the report, associating it with the retrieved ad and the authenticated user (if any).
+            # A client retrying with the same Idempotency-Key header files the report only once.
+            reported_by_id = request.user.pk if request.user.is_authenticated else None
+            enqueue(
+                'ads.create_report',
+                idempotency_key=f'report:{ad.pk}:{reported_by_id or "anonymous"}:{client_key}' if client_key else None,
+                ad_id=ad.pk,
+                reported_by_id=reported_by_id,
+                report_reason=serializer.validated_data.get('report_reason', 'OTHER'),
+                other_details=serializer.validated_data.get('other_details', ''),
+            )
+
+            return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
         else:
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+class SavedSearchListView(ListCreateAPIView):
+    # API view for listing and saving the current user's searches.
+    serializer_class = SavedSearchSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class SavedSearchDeleteView(DestroyAPIView):
+    # API view for deleting one of the current user's saved searches.
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return SavedSearch.objects.filter(user=self.request.user)
+
+class SavedSearchMatchesView(ListAPIView):
+    # API view for the ads that recently matched the current user's saved searches.
+    serializer_class = AdSerializer
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Ad.objects.filter(saved_search_matches__saved_search__user=self.request.user) \
+            .exclude(status='DE').annotate(last_matched_at=Max('saved_search_matches__matched_at')) \
+            .select_related('owned_by').prefetch_related('images').order_by('-last_matched_at')[:100]
@@ -0,0 +1,18 @@
+from django.contrib.admin.widgets import AdminFileWidget
+from django.utils.safestring import mark_safe
+
+class AdminImageWidget(AdminFileWidget): # Custom widget for rendering image fields in the admin panel.
+    def render(self, name, value, attrs=None, renderer=None):
+        output = []
+
+        if value and getattr(value, "url", None):
+            image_url = value.url
+            file_name = str(value)
+
+            output.append(
+                f' <a href="{image_url}" target="_blank">'
+                f'  <img src="{image_url}" alt="{file_name}" width="150" height="150" '
+                f'style="object-fit: cover;"/> </a>')
+
+        output.append(super(AdminFileWidget, self).render(name, value, attrs, renderer))
+        return mark_safe(u''.join(output))
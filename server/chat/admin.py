@@ -1,14 +1,27 @@
 from django.contrib import admin
-from .models import Message
+from .models import ArchivedConversation, Message
+from .search import filter_by_search
 
 class MessageAdmin(admin.ModelAdmin):
     list_display = ('id', 'sender', 'receiver', 'text', 'timestamp')  # Customize the fields to display in the list view
     list_filter = ('sender', 'receiver', 'timestamp')  # Add filter options on the side
     search_fields = ('text',)  # Enable search functionality on the text field
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search message text through the full-text index instead of a LIKE scan."""
+        if not search_term:
+            return queryset, False
+        return filter_by_search(queryset, search_term), False
+
     def get_ordering(self, request):
         """Custom ordering for the messages in the admin list view."""
         return ['-timestamp']  # Orders messages by timestamp in descending order
 
 # Now register the model along with the customized admin options
 admin.site.register(Message, MessageAdmin)
+
+class ArchivedConversationAdmin(admin.ModelAdmin): # Admin class for inspecting conversations moved to cold storage.
+    list_display = ('id', 'first_user', 'second_user', 'message_count', 'last_message_at', 'updated_at')
+    raw_id_fields = ('first_user', 'second_user')
+
+admin.site.register(ArchivedConversation, ArchivedConversationAdmin)
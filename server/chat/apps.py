@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class ChatConfig(AppConfig): # Define the configuration for the chat app
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'chat'
+
+    def ready(self): # Create the message search index (and its sync triggers) after migrations
+        from .search import ensure_search_index
+        post_migrate.connect(ensure_search_index, sender=self, dispatch_uid='chat.ensure_search_index')
@@ -1,28 +1,86 @@
+import asyncio
 import json
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from rest_framework.authtoken.models import Token
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 
+from metrics.middleware import ConsumerMetricsMixin
+from core.utils import MAX_LOOKUP_IDS
+from . import presence
 from .models import Message
+from .notifications import user_group
+from .presence import presence_group
 from .serializers import MessageSerializer
 
-class ChatConsumer(AsyncWebsocketConsumer):
-    # Track connected users and their channels
-    connected_users = {}  # Maps user IDs to WebSocket channel names
+
+# Pending offline announcements of this process by user id. Holding the tasks here keeps them from being
+# garbage collected after their consumer is gone, and lets a reconnect cancel them. The announcement still
+# checks the shared presence store, so a reconnect through another worker suppresses it as well.
+offline_announcements = {}
+
+
+def schedule_offline_announcement(channel_layer, user_id):
+    cancel_offline_announcement(user_id)
+    task = asyncio.create_task(announce_offline_later(channel_layer, user_id))
+    offline_announcements[user_id] = task
+    task.add_done_callback(lambda done: forget_offline_announcement(user_id, done))
+
+
+def forget_offline_announcement(user_id, task): # Drop a finished task unless it was already replaced
+    if offline_announcements.get(user_id) is task:
+        del offline_announcements[user_id]
+
+
+def cancel_offline_announcement(user_id):
+    task = offline_announcements.pop(user_id, None)
+    if task is not None:
+        task.cancel()
+
+
+async def announce_offline_later(channel_layer, user_id):
+    """
+    Tells the user's presence subscribers they went offline, unless they reconnect
+    within PRESENCE_OFFLINE_GRACE (e.g. a page reload), so short drops are coalesced.
+    """
+    await asyncio.sleep(settings.PRESENCE_OFFLINE_GRACE)
+    if not await presence.is_online(user_id):
+        await channel_layer.group_send(presence_group(user_id), {
+            'type': 'user.event', 'event': 'presence', 'payload': {'user': user_id, 'online': False, 'last_seen': time.time()},
+        })
+
+class ChatConsumer(ConsumerMetricsMixin, AsyncWebsocketConsumer):
+    # Sockets are only addressed through channel layer groups, never through process-local state,
+    # so a message reaches the receiver whichever worker process holds their socket.
 
     async def connect(self):
         token_key = self.scope['query_string'].decode().split('=')[1]
         self.user = await self.authenticate_user(token_key)
+        # State of the ephemeral events (typing, presence); never stored in the database
+        self.event_limiter = presence.RateLimiter(settings.CHAT_EVENT_BURST, settings.CHAT_EVENT_RATE)
+        self.typing_sent = {}  # Maps receiver IDs to when the last typing event was forwarded
+        self.presence_subscriptions = set()
+        self.heartbeat_task = None
         if self.user is not None:
             await self.accept()
-            # Store the channel name against the user
-            self.connected_users[self.user.id] = self.channel_name
+            # Join the user's group for chat messages and pushed events (e.g. saved search matches)
+            await self.channel_layer.group_add(user_group(self.user.id), self.channel_name)
+            cancel_offline_announcement(self.user.id)
+            if await presence.connected(self.user.id):
+                await self.announce_presence(online=True)
+            self.heartbeat_task = asyncio.create_task(self.keep_presence_alive())
         else:
             await self.close()
 
     async def receive(self, text_data):
         text_data_json = json.loads(text_data)
+        event = text_data_json.get('event')
+        if event is not None:
+            await self.receive_event(event, text_data_json)
+            return
+
         message_text = text_data_json['message']
         receiver_id = text_data_json.get('receiver')
         
@@ -37,24 +95,91 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 
                 # Send message to the sender as a confirmation
                 await self.send(text_data=json.dumps(message_data))
+                # The message ends the sender's typing indicator on the receiver's side
+                self.typing_sent.pop(receiver_user.id, None)
 
-                # If the receiver is connected, send them the message
-                receiver_channel_name = self.connected_users.get(receiver_user.id)
-                if receiver_channel_name:
-                    await self.channel_layer.send(receiver_channel_name, {
-                        "type": "chat.message",
-                        "text": json.dumps(message_data),
-                    })
+                # Send the message to every open socket of the receiver
+                await self.channel_layer.group_send(user_group(receiver_user.id), {
+                    "type": "chat.message",
+                    "text": json.dumps(message_data),
+                })
             else:
                 print('Receiver not found.')
                 await self.send(text_data=json.dumps({'error': 'Receiver not found.'}))
         else:
             await self.send(text_data=json.dumps({'message': message_text}))
 
+    async def receive_event(self, event, data):
+        """
+        Handles an ephemeral event sent by the client. These only pass through the
+        channel layer and presence store, and are dropped once the socket exceeds
+        CHAT_EVENT_BURST events at CHAT_EVENT_RATE per second.
+
+            {"event": "typing", "receiver": <user id>}         while the user types
+            {"event": "typing.stop", "receiver": <user id>}    when they stop without sending
+            {"event": "presence.subscribe", "users": [<id>, ...]}
+            {"event": "ping"}                                  keeps the user online
+        """
+        if not self.event_limiter.allow():
+            return
+        if event in ('typing', 'typing.stop'):
+            await self.forward_typing(data.get('receiver'), typing=event == 'typing')
+        elif event == 'presence.subscribe':
+            await self.subscribe_presence(data.get('users'))
+        elif event == 'ping':
+            await presence.heartbeat(self.user.id)
+        else:
+            await self.send(text_data=json.dumps({'event': 'error', 'error': f'Unknown event "{event}".'}))
+
+    async def forward_typing(self, receiver_id, typing):
+        # Typing events are coalesced: at most one per receiver every TYPING_EVENT_INTERVAL seconds
+        # (the receiver shows the indicator until it times out) and a stop only after a start.
+        if not isinstance(receiver_id, int) or receiver_id == self.user.id:
+            return
+        if typing:
+            last_sent = self.typing_sent.get(receiver_id)
+            if last_sent is not None and time.monotonic() - last_sent < settings.TYPING_EVENT_INTERVAL:
+                return
+            self.typing_sent[receiver_id] = time.monotonic()
+        elif self.typing_sent.pop(receiver_id, None) is None:
+            return
+        await self.channel_layer.group_send(user_group(receiver_id), {
+            'type': 'user.event', 'event': 'typing' if typing else 'typing.stop', 'payload': {'user': self.user.id},
+        })
+
+    async def subscribe_presence(self, user_ids):
+        # Follow the online/offline changes of up to MAX_LOOKUP_IDS users (replacing earlier subscriptions)
+        # and reply with their current presence.
+        if not isinstance(user_ids, list):
+            return
+        wanted = {user_id for user_id in user_ids if isinstance(user_id, int)}
+        wanted = set(sorted(wanted)[:MAX_LOOKUP_IDS])
+        for user_id in self.presence_subscriptions - wanted:
+            await self.channel_layer.group_discard(presence_group(user_id), self.channel_name)
+        for user_id in wanted - self.presence_subscriptions:
+            await self.channel_layer.group_add(presence_group(user_id), self.channel_name)
+        self.presence_subscriptions = wanted
+        await self.send(text_data=json.dumps({'event': 'presence.snapshot', 'users': await presence.asnapshot(sorted(wanted))}))
+
+    async def announce_presence(self, online):
+        await self.channel_layer.group_send(presence_group(self.user.id), {
+            'type': 'user.event', 'event': 'presence', 'payload': {'user': self.user.id, 'online': online, 'last_seen': None},
+        })
+
+    async def keep_presence_alive(self): # Refresh the user's online entry while the socket is open
+        while True:
+            await asyncio.sleep(settings.PRESENCE_TTL / 3)
+            await presence.heartbeat(self.user.id)
+
     async def disconnect(self, close_code):
-        # Remove user from connected users on disconnect
-        if self.user and self.user.id in self.connected_users:
-            del self.connected_users[self.user.id]
+        if self.user:
+            await self.channel_layer.group_discard(user_group(self.user.id), self.channel_name)
+            for user_id in self.presence_subscriptions:
+                await self.channel_layer.group_discard(presence_group(user_id), self.channel_name)
+            if self.heartbeat_task is not None:
+                self.heartbeat_task.cancel()
+            if await presence.disconnected(self.user.id):
+                schedule_offline_announcement(self.channel_layer, self.user.id)
         await self.close()
 
     # Handler for sending message to the receiver's channel
@@ -62,6 +187,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
         # Send message to WebSocket
         await self.send(text_data=event["text"])
 
+    # Handler for events pushed to the user's group (see chat.notifications.notify_users)
+    async def user_event(self, event):
+        await self.send(text_data=json.dumps({"event": event["event"], **event["payload"]}))
+
     @database_sync_to_async
     def authenticate_user(self, token_key):
         try:
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chat.retention import RetentionRun
+
+
+class Command(BaseCommand):
+    """
+    Applies the chat retention policies (CHAT_PURGE_DEACTIVATED_USERS, CHAT_ARCHIVE_AFTER_DAYS).
+    Work is done in short, separately committed batches, so the command can run next to the
+    live site, be stopped at any time and resume on the next run. Schedule it e.g. nightly:
+
+        30 3 * * * cd /path/to/server && .venv/bin/python manage.py apply_message_retention --max-batches 500
+    """
+    help = 'Purge messages of deactivated users and archive inactive conversations to cold storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-after-days', type=int, default=settings.CHAT_ARCHIVE_AFTER_DAYS,
+                            help='Archive conversations without messages for this many days (0 disables)')
+        parser.add_argument('--batch-size', type=int, default=settings.CHAT_RETENTION_BATCH_SIZE,
+                            help='Messages per batch (and transaction)')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        run = RetentionRun(options['batch_size'], options['max_batches'], options['pause'], log=self.stdout.write)
+        if settings.CHAT_PURGE_DEACTIVATED_USERS:
+            run.purge_deactivated_users()
+        if options['archive_after_days'] and run.budget_left():
+            run.archive_inactive(timezone.now() - timedelta(days=options['archive_after_days']))
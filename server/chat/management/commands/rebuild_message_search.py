@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from chat.search import ensure_search_index, rebuild_search_index, uses_fts
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the chat message full-text index. The index is created by `migrate` and
+    kept in sync by database triggers, so this is only needed to repair or compact it.
+    """
+    help = 'Rebuild the chat message search index'
+
+    def handle(self, *args, **options):
+        if not uses_fts():
+            raise CommandError('The message search index requires SQLite (FTS5).')
+        ensure_search_index()
+        rebuild_search_index()
+        self.stdout.write('Message search index rebuilt')
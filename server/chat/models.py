@@ -19,4 +19,39 @@ class Message(models.Model):
         return f"Message {self.text} to {self.receiver} from {self.sender}"
 
     class Meta: # Set the ordering of the messages in the admin panel
-        ordering = ['-timestamp']
\ No newline at end of file
+        ordering = ['-timestamp']
+        indexes = [ # Serve a user's newest messages (sent or received) without scanning the table
+            models.Index(fields=['sender', '-timestamp'], name='chat_sender_recent_idx'),
+            models.Index(fields=['receiver', '-timestamp'], name='chat_receiver_recent_idx'),
+        ]
+
+
+class ArchivedConversation(models.Model):
+    """
+    A conversation whose messages were moved to cold storage by `apply_message_retention`.
+
+    The messages live in a gzip compressed JSONL file per conversation (see
+    chat.retention.archive_path); this row records how far archiving got.
+
+    Attributes:
+        first_user (CustomUser): The participant with the lower id.
+        second_user (CustomUser): The participant with the higher id.
+        message_count (int): Number of archived messages.
+        last_message_at (datetime): Timestamp of the newest archived message.
+        archived_through (int): Id of the newest archived message.
+        updated_at (datetime): When messages were last added to the archive.
+    """
+    first_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    second_user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='+', on_delete=models.CASCADE)
+    message_count = models.PositiveIntegerField(default=0)
+    last_message_at = models.DateTimeField(null=True)
+    archived_through = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['first_user', 'second_user'], name='chat_archived_conversation_unique'),
+        ]
+
+    def __str__(self):
+        return f"Archive of {self.first_user_id} and {self.second_user_id} ({self.message_count} messages)"
\ No newline at end of file
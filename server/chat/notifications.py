@@ -0,0 +1,20 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+
+def user_group(user_id): # Channel layer group joined by every chat socket of a user
+    return f'user_{user_id}'
+
+
+def notify_users(user_ids, event, payload):
+    """
+    Pushes an event to every open chat socket of the given users through the
+    channel layer. The socket receives `{"event": event, **payload}`.
+    Users without an open socket simply miss the push.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    message = {'type': 'user.event', 'event': event, 'payload': payload}
+    for user_id in set(user_ids):
+        async_to_sync(channel_layer.group_send)(user_group(user_id), message)
@@ -0,0 +1,99 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Presence lives in the Django cache: shared between processes when the cache backend is (e.g. Redis),
+# process-local with the default in-memory cache. Nothing is written to the database.
+ONLINE_KEY = 'presence:online:{}'  # Number of open chat sockets of a user; expires unless refreshed
+SEEN_KEY = 'presence:seen:{}'  # Unix time the user's last socket closed
+
+
+def presence_group(user_id): # Channel layer group of the sockets subscribed to a user's presence
+    return f'presence_{user_id}'
+
+
+async def connected(user_id):
+    """
+    Counts a new socket of the user. Returns True if the user just came online
+    (rather than reconnecting within PRESENCE_OFFLINE_GRACE or opening another tab).
+    """
+    key = ONLINE_KEY.format(user_id)
+    await cache.aadd(key, 0, settings.PRESENCE_TTL)
+    count = await cache.aincr(key)
+    await cache.atouch(key, settings.PRESENCE_TTL)
+    if count > 1:
+        return False
+    last_seen = await cache.aget(SEEN_KEY.format(user_id))
+    return last_seen is None or time.time() - last_seen > settings.PRESENCE_OFFLINE_GRACE
+
+
+async def disconnected(user_id):
+    """
+    Counts a closed socket of the user. Returns True if it was their last one, in
+    which case the last-seen time is recorded.
+    """
+    key = ONLINE_KEY.format(user_id)
+    try:
+        count = await cache.adecr(key)
+    except ValueError:  # Expired, e.g. after a missed heartbeat
+        count = 0
+    if count > 0:
+        return False
+    await cache.adelete(key)
+    await cache.aset(SEEN_KEY.format(user_id), time.time(), settings.PRESENCE_SEEN_TTL)
+    return True
+
+
+async def heartbeat(user_id): # Keep the user's online entry alive while a socket is open
+    key = ONLINE_KEY.format(user_id)
+    if not await cache.atouch(key, settings.PRESENCE_TTL):
+        await cache.aadd(key, 1, settings.PRESENCE_TTL)
+
+
+async def is_online(user_id):
+    return await cache.aget(ONLINE_KEY.format(user_id)) is not None
+
+
+def snapshot_keys(user_ids):
+    return [ONLINE_KEY.format(user_id) for user_id in user_ids] + [SEEN_KEY.format(user_id) for user_id in user_ids]
+
+
+def snapshot_from(values, user_ids): # Build {user id: {"online": bool, "last_seen": unix time or None}}
+    return {
+        user_id: {
+            'online': ONLINE_KEY.format(user_id) in values,
+            'last_seen': values.get(SEEN_KEY.format(user_id)),
+        }
+        for user_id in user_ids
+    }
+
+
+def snapshot(user_ids): # Presence of the given users, read with a single cache round trip
+    return snapshot_from(cache.get_many(snapshot_keys(user_ids)), user_ids)
+
+
+async def asnapshot(user_ids):
+    return snapshot_from(await cache.aget_many(snapshot_keys(user_ids)), user_ids)
+
+
+class RateLimiter:
+    """
+    Token bucket limiting the ephemeral events a single socket may send: bursts of
+    up to `capacity` events, refilled at `rate` events per second.
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def allow(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
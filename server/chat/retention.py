@@ -0,0 +1,196 @@
+import gzip
+import json
+import os
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.functions import Greatest, Least
+from django.utils.dateparse import parse_datetime
+
+from sync.changes import unlogged_deletes
+from .models import ArchivedConversation, Message
+
+
+def archive_path(first_user_id, second_user_id): # Cold storage file of the conversation between two users
+    first_user_id, second_user_id = sorted((first_user_id, second_user_id))
+    return os.path.join(settings.CHAT_ARCHIVE_ROOT, str(first_user_id), f'{first_user_id}-{second_user_id}.jsonl.gz')
+
+
+def conversation_filter(first_user_id, second_user_id): # Messages in either direction between two users
+    return Q(sender_id=first_user_id, receiver_id=second_user_id) | Q(sender_id=second_user_id, receiver_id=first_user_id)
+
+
+def inactive_conversations(cutoff):
+    """
+    Returns (first_user_id, second_user_id) pairs, lower id first, of the
+    conversations whose newest message is older than `cutoff`.
+    """
+    return Message.objects.annotate(first=Least('sender_id', 'receiver_id'), second=Greatest('sender_id', 'receiver_id')) \
+        .values('first', 'second').annotate(last_at=Max('timestamp')).filter(last_at__lt=cutoff) \
+        .order_by('first', 'second').values_list('first', 'second')
+
+
+def append_to_archive(path, messages):
+    """
+    Appends messages to a conversation archive as a new gzip member and syncs it
+    to disk. Readers decompress all members in sequence, so the file is valid
+    after every batch.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as archive:
+        with gzip.GzipFile(fileobj=archive, mode='wb') as compressed:
+            for message in messages:
+                compressed.write(json.dumps({
+                    'id': message.id,
+                    'sender': message.sender_id,
+                    'receiver': message.receiver_id,
+                    'text': message.text,
+                    'timestamp': message.timestamp.isoformat(),
+                }).encode() + b'\n')
+        archive.flush()
+        os.fsync(archive.fileno())
+
+
+def read_archive(first_user_id, second_user_id):
+    """
+    Returns the archived messages of a conversation as dicts, newest first.
+
+    The parsed archive is cached per process under the file's modification time and
+    size, so paging through a conversation decompresses it once; appending a batch
+    changes the key. The result is shared between callers and must not be modified.
+    """
+    path = archive_path(first_user_id, second_user_id)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ()
+    return load_archive(path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=settings.CHAT_ARCHIVE_CACHE_SIZE)
+def load_archive(path, mtime_ns, size):
+    """
+    Parses an archive file. A batch is written to the file before its rows are
+    deleted, so a run that was interrupted in between may have written it twice;
+    records are deduplicated by id.
+    """
+    records = {}
+    with gzip.open(path, 'rt') as archive:
+        for line in archive:
+            record = json.loads(line)
+            record['timestamp'] = parse_datetime(record['timestamp'])
+            records[record['id']] = record
+    return tuple(sorted(records.values(), key=lambda record: record['id'], reverse=True))
+
+
+def archived_messages(records, users):
+    """
+    Turns archive records into unsaved Message instances (with `users` mapping ids to
+    users), so archived history is serialized exactly like live messages.
+    """
+    return [
+        Message(id=record['id'], sender=users[record['sender']], receiver=users[record['receiver']],
+                text=record['text'], timestamp=record['timestamp'])
+        for record in records
+    ]
+
+
+def archive_conversation(first_user_id, second_user_id, cutoff, batch_size):
+    """
+    Moves the next batch (oldest first) of a conversation's messages from before
+    `cutoff` to cold storage. Each batch commits on its own, so write locks are
+    held only briefly and an interrupted run resumes where it stopped. Returns the
+    number of archived messages (0 once the conversation is done).
+    """
+    batch = list(
+        Message.objects.filter(conversation_filter(first_user_id, second_user_id), timestamp__lt=cutoff)
+        .order_by('id')[:batch_size]
+    )
+    if not batch:
+        return 0
+
+    append_to_archive(archive_path(first_user_id, second_user_id), batch)
+    with transaction.atomic():
+        archived, _ = ArchivedConversation.objects.select_for_update().get_or_create(
+            first_user_id=first_user_id, second_user_id=second_user_id
+        )
+        archived.message_count += len(batch)
+        archived.archived_through = max(archived.archived_through, batch[-1].id)
+        archived.last_message_at = max(message.timestamp for message in batch)
+        archived.save()
+        ids = [message.id for message in batch]
+        with unlogged_deletes('message', ids):  # Still readable from the archive, so not a deletion for sync clients
+            Message.objects.filter(id__in=ids).delete()
+    return len(batch)
+
+
+def purge_deactivated_batch(batch_size):
+    """
+    Deletes the next batch of messages (and archives) that involve a deactivated
+    user. Returns the number of deleted messages and archives.
+    """
+    inactive = Q(sender__is_active=False) | Q(receiver__is_active=False)
+    ids = list(Message.objects.filter(inactive).order_by().values_list('id', flat=True)[:batch_size])
+    if ids:
+        Message.objects.filter(id__in=ids).delete()
+        return len(ids)
+
+    archives = list(ArchivedConversation.objects.filter(
+        Q(first_user__is_active=False) | Q(second_user__is_active=False)
+    )[:batch_size])
+    for archived in archives:
+        path = archive_path(archived.first_user_id, archived.second_user_id)
+        if os.path.exists(path):
+            os.remove(path)
+        archived.delete()
+    return len(archives)
+
+
+class RetentionRun:
+    """
+    Applies the retention policies in batches of `batch_size`, stopping after
+    `max_batches` batches (None for no limit) and sleeping `pause` seconds between
+    batches so concurrent writers are not starved.
+    """
+
+    def __init__(self, batch_size, max_batches=None, pause=0.0, log=None):
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.pause = pause
+        self.log = log or (lambda message: None)
+        self.batches = 0
+        self.purged = 0
+        self.archived = 0
+
+    def budget_left(self):
+        return self.max_batches is None or self.batches < self.max_batches
+
+    def step(self): # Count a finished batch and pause before the next one
+        self.batches += 1
+        if self.pause:
+            time.sleep(self.pause)
+
+    def purge_deactivated_users(self):
+        while self.budget_left():
+            deleted = purge_deactivated_batch(self.batch_size)
+            if not deleted:
+                break
+            self.purged += deleted
+            self.step()
+        self.log(f'Purged {self.purged} messages/archives of deactivated users')
+
+    def archive_inactive(self, cutoff):
+        for first_user_id, second_user_id in list(inactive_conversations(cutoff)):
+            while self.budget_left():
+                archived = archive_conversation(first_user_id, second_user_id, cutoff, self.batch_size)
+                if not archived:
+                    break
+                self.archived += archived
+                self.step()
+            if not self.budget_left():
+                self.log('Batch limit reached; run again to continue')
+                break
+        self.log(f'Archived {self.archived} messages from conversations inactive since {cutoff:%Y-%m-%d}')
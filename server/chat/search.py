@@ -0,0 +1,152 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Message
+
+# Full-text index over Message.text (SQLite FTS5, contentless so the text is not stored twice).
+# Every message is indexed once per participant, with `owner` holding a `u<user id>` token, so
+# restricting a search to one user's conversations is part of the MATCH itself rather than a
+# filter over every hit. Rowids are `2 * message id` (sender) and `2 * message id + 1` (receiver),
+# which keeps the index in message order and lets results be paged by message id.
+# Triggers on chat_message keep it in sync with every write, including the chat consumer,
+# SendMessageView, bulk inserts and deletes.
+FTS_TABLE = 'chat_message_fts'
+
+CREATE_TABLE = f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        owner, text, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+"""
+
+CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON chat_message BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, owner, text) VALUES (new.id * 2, 'u' || new.sender_id, new.text);
+        INSERT INTO {FTS_TABLE}(rowid, owner, text) SELECT new.id * 2 + 1, 'u' || new.receiver_id, new.text
+            WHERE new.receiver_id != new.sender_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON chat_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, text) VALUES ('delete', old.id * 2, 'u' || old.sender_id, old.text);
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, text) SELECT 'delete', old.id * 2 + 1, 'u' || old.receiver_id, old.text
+            WHERE old.receiver_id != old.sender_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF text, sender_id, receiver_id ON chat_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, text) VALUES ('delete', old.id * 2, 'u' || old.sender_id, old.text);
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, owner, text) SELECT 'delete', old.id * 2 + 1, 'u' || old.receiver_id, old.text
+            WHERE old.receiver_id != old.sender_id;
+        INSERT INTO {FTS_TABLE}(rowid, owner, text) VALUES (new.id * 2, 'u' || new.sender_id, new.text);
+        INSERT INTO {FTS_TABLE}(rowid, owner, text) SELECT new.id * 2 + 1, 'u' || new.receiver_id, new.text
+            WHERE new.receiver_id != new.sender_id;
+    END
+    """,
+]
+
+BACKFILL = f"""
+    INSERT INTO {FTS_TABLE}(rowid, owner, text)
+        SELECT id * 2, 'u' || sender_id, text FROM chat_message
+        UNION ALL
+        SELECT id * 2 + 1, 'u' || receiver_id, text FROM chat_message WHERE receiver_id != sender_id
+"""
+
+MAX_TERMS = 8
+TERM_RE = re.compile(r'\w+')
+
+
+def uses_fts(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def ensure_search_index(using='default', **kwargs):
+    """
+    Creates the FTS table and its triggers if they are missing, indexing the
+    existing messages when the table is new. Connected to post_migrate.
+    """
+    if not uses_fts(using):
+        return
+    connection = connections[using]
+    tables = connection.introspection.table_names()
+    if Message._meta.db_table not in tables:
+        return
+    with connection.cursor() as cursor:
+        created = FTS_TABLE not in tables
+        if created:
+            cursor.execute(CREATE_TABLE)
+        for trigger in CREATE_TRIGGERS:
+            cursor.execute(trigger)
+        if created:
+            cursor.execute(BACKFILL)
+
+
+def rebuild_search_index(using='default'): # Re-index every message from scratch
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        cursor.execute(BACKFILL)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def match_expression(query, user_id=None):
+    """
+    Turns free text into an FTS5 query: every word must occur (as a prefix, so
+    partially typed words match) and, for a user, the message must be theirs.
+    Returns None if the text contains no searchable words.
+    """
+    terms = TERM_RE.findall(query.lower())[:MAX_TERMS]
+    if not terms:
+        return None
+    expression = 'text : (' + ' '.join(f'"{term}"*' for term in terms) + ')'
+    if user_id is not None:
+        expression = f'owner : "u{user_id}" AND {expression}'
+    return expression
+
+
+def search_message_ids(query, user, before=None, limit=50):
+    """
+    Returns the ids of `user`'s messages matching `query`, newest first, limited
+    to `limit` ids older than message id `before` (for paging).
+    """
+    expression = match_expression(query, user.pk)
+    if expression is None:
+        return []
+
+    if not uses_fts():
+        messages = Message.objects.filter(Q(sender=user) | Q(receiver=user))
+        for term in TERM_RE.findall(query)[:MAX_TERMS]:
+            messages = messages.filter(text__icontains=term)
+        if before is not None:
+            messages = messages.filter(id__lt=before)
+        return list(messages.order_by('-id').values_list('id', flat=True)[:limit])
+
+    sql = f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s'
+    params = [expression]
+    if before is not None:
+        sql += ' AND rowid < %s'
+        params.append(before * 2)
+    sql += ' ORDER BY rowid DESC LIMIT %s'
+    params.append(limit)
+    with connections['default'].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [rowid // 2 for rowid, in cursor.fetchall()]
+
+
+def filter_by_search(queryset, query):
+    """
+    Narrows a Message queryset to messages matching `query` across all users
+    (used by the admin search), evaluated in the database as a subquery.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return queryset
+    if not uses_fts():
+        for term in TERM_RE.findall(query)[:MAX_TERMS]:
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT DISTINCT rowid / 2 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [expression]
+    ))
@@ -1,3 +1,188 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from channels.testing import WebsocketCommunicator
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from core.deployment import check_process_model
+from users.models import CustomUser
+from .consumers import ChatConsumer, offline_announcements
+from .models import Message
+from .retention import RetentionRun, load_archive
+
+
+class ArchivedMessagesTests(APITestCase):
+    def setUp(self):
+        archive_root = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_root.cleanup)
+        settings_override = override_settings(CHAT_ARCHIVE_ROOT=archive_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com')
+        self.other = CustomUser.objects.create_user(username='bob', email='bob@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        for index in range(5):
+            sender, receiver = (self.user, self.other) if index % 2 else (self.other, self.user)
+            Message.objects.create(sender=sender, receiver=receiver, text=f'message {index}')
+        self.live = self.client.get('/api/messages/').data
+        Message.objects.update(timestamp=timezone.now() - timedelta(days=365))
+        RetentionRun(batch_size=2).archive_inactive(timezone.now() - timedelta(days=180))
+
+    def test_archived_messages_match_live_representation(self):
+        self.assertFalse(Message.objects.exists())
+        response = self.client.get(f'/api/messages/archive/{self.other.pk}/', {'page_size': 10})
+        self.assertEqual(response.status_code, 200)
+        archived = response.data['results']
+        self.assertEqual([message['id'] for message in archived], sorted((message['id'] for message in self.live), reverse=True))
+        live = {message['id']: message for message in self.live}
+        for message in archived:
+            self.assertEqual({**message, 'timestamp': None}, {**live[message['id']], 'timestamp': None})
+
+    def test_pages_are_served_from_one_parse(self):
+        load_archive.cache_clear()
+        url, pages = f'/api/messages/archive/{self.other.pk}/?page_size=2', []
+        while url:
+            response = self.client.get(url)
+            pages.append([message['id'] for message in response.data['results']])
+            url = response.data['next']
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sorted(sum(pages, []), reverse=True), sum(pages, []))
+        self.assertEqual(load_archive.cache_info().misses, 1)
+
+    def test_invalid_paging_parameters_are_rejected(self):
+        url = f'/api/messages/archive/{self.other.pk}/'
+        for params in ({'before': '²'}, {'before': '9' * 19}, {'page_size': '²'}, {'page_size': 'all'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.data)
+
+
+LOCAL_STATE = {
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+}
+SHARED_STATE = {
+    'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels_redis.core.RedisChannelLayer'}},
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}},
+}
+
+
+class ProcessModelTests(SimpleTestCase):
+    @override_settings(WEB_CONCURRENCY=1, TASK_WORKER_PROCESSES=0, TASKS_ALWAYS_EAGER=False, **LOCAL_STATE)
+    def test_single_process_may_use_local_state(self):
+        check_process_model()
+
+    @override_settings(WEB_CONCURRENCY=3, TASK_WORKER_PROCESSES=0, **LOCAL_STATE)
+    def test_several_workers_need_shared_state(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'InMemoryChannelLayer'):
+            check_process_model()
+
+    @override_settings(WEB_CONCURRENCY=1, TASK_WORKER_PROCESSES=0, **LOCAL_STATE)
+    def test_task_worker_counts_itself(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'LocMemCache'):
+            check_process_model(task_worker=True)
+
+    @override_settings(WEB_CONCURRENCY=3, TASK_WORKER_PROCESSES=1, **SHARED_STATE)
+    def test_shared_state_allows_several_processes(self):
+        check_process_model()
+        check_process_model(task_worker=True)
+
+
+class ChatSocketTestCase(TestCase): # Two users with API tokens and a helper opening their chat sockets
+    def setUp(self):
+        cache.clear()
+        self.sender = CustomUser.objects.create_user(username='sender', email='sender@example.com')
+        self.receiver = CustomUser.objects.create_user(username='receiver', email='receiver@example.com')
+        self.tokens = {user.pk: Token.objects.create(user=user).key for user in (self.sender, self.receiver)}
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/chat/?token={self.tokens[user.pk]}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+
+class ChatDeliveryTests(ChatSocketTestCase):
+    async def test_message_reaches_every_socket_of_the_receiver(self):
+        # Delivery goes through the receiver's channel layer group, which a shared layer spans across workers
+        sender = await self.connect(self.sender)
+        receivers = [await self.connect(self.receiver), await self.connect(self.receiver)]
+        await sender.send_json_to({'receiver': self.receiver.pk, 'message': 'hello'})
+        self.assertEqual((await sender.receive_json_from())['text'], 'hello')
+        for receiver in receivers:
+            self.assertEqual((await receiver.receive_json_from())['text'], 'hello')
+        for communicator in (sender, *receivers):
+            await communicator.disconnect()
+
+
+@override_settings(PRESENCE_OFFLINE_GRACE=0.05)
+class OfflineAnnouncementTests(ChatSocketTestCase):
+    async def test_offline_event_is_sent_after_the_grace_period(self):
+        watcher = await self.connect(self.sender)
+        await watcher.send_json_to({'event': 'presence.subscribe', 'users': [self.receiver.pk]})
+        await watcher.receive_json_from()  # Snapshot
+        receiver = await self.connect(self.receiver)
+        self.assertEqual(await watcher.receive_json_from(), {'event': 'presence', 'user': self.receiver.pk, 'online': True, 'last_seen': None})
+        await receiver.disconnect()
+        self.assertIn(self.receiver.pk, offline_announcements)
+        event = await watcher.receive_json_from(timeout=1)
+        self.assertEqual((event['event'], event['online']), ('presence', False))
+        self.assertNotIn(self.receiver.pk, offline_announcements)
+        await watcher.disconnect()
+
+    async def test_reconnect_cancels_the_announcement(self):
+        receiver = await self.connect(self.receiver)
+        await receiver.disconnect()
+        task = offline_announcements[self.receiver.pk]
+        receiver = await self.connect(self.receiver)
+        await asyncio.sleep(0)
+        self.assertTrue(task.cancelled())
+        self.assertNotIn(self.receiver.pk, offline_announcements)
+        await receiver.disconnect()
+        offline_announcements.pop(self.receiver.pk).cancel()
+
+
+class MessageSearchTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com')
+        self.other = CustomUser.objects.create_user(username='bob', email='bob@example.com')
+        self.third = CustomUser.objects.create_user(username='carol', email='carol@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+        self.matches = [
+            Message.objects.create(sender=self.other, receiver=self.user, text='Is the textbook still available?'),
+            Message.objects.create(sender=self.user, receiver=self.other, text='Yes, the Textbooks are here'),
+            Message.objects.create(sender=self.user, receiver=self.other, text='And a textbook stand'),
+        ]
+        Message.objects.create(sender=self.other, receiver=self.user, text='Unrelated')
+        Message.objects.create(sender=self.other, receiver=self.third, text='Another textbook, not for alice')
+
+    def test_search_matches_own_messages_by_prefix_newest_first(self):
+        response = self.client.get('/api/messages/search/', {'q': 'textb'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([message['id'] for message in response.data['results']], [message.pk for message in reversed(self.matches)])
+        self.assertEqual(self.client.get('/api/messages/search/').status_code, 400)
+
+    def test_search_pages_by_message_id(self):
+        response = self.client.get('/api/messages/search/', {'q': 'textbook', 'page_size': 2})
+        first_page = [message['id'] for message in response.data['results']]
+        second_page = [message['id'] for message in self.client.get(response.data['next']).data['results']]
+        self.assertEqual(first_page + second_page, [message.pk for message in reversed(self.matches)])
+
+    def test_deleted_messages_leave_the_index(self):
+        self.matches[0].delete()
+        response = self.client.get('/api/messages/search/', {'q': 'available'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_paging_parameters_are_rejected(self):
+        for params in ({'before': '²'}, {'before': '9' * 19}, {'before': '-1'}, {'page_size': '²'}, {'page_size': '0'}):
+            response = self.client.get('/api/messages/search/', {'q': 'textbook', **params})
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn(next(iter(params)), response.data)
+        self.assertEqual(self.client.get('/api/messages/search/', {'q': 'textbook', 'before': '9' * 18}).status_code, 200)
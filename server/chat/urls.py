@@ -1,7 +1,10 @@
 from django.urls import path
-from .views import MessageListView, SendMessageView
+from .views import ArchivedMessagesView, MessageListView, MessageSearchView, PresenceView, SendMessageView
 
 urlpatterns = [
     path('', MessageListView.as_view(), name='message-list'), # URL pattern for the message list view
+    path('search/', MessageSearchView.as_view(), name='message-search'), # URL pattern for searching the user's messages
+    path('archive/<int:user_id>/', ArchivedMessagesView.as_view(), name='message-archive'), # URL pattern for archived conversation history
+    path('presence/', PresenceView.as_view(), name='presence'), # URL pattern for the presence snapshot
     path('send/', SendMessageView.as_view(), name='message-list'), # URL pattern for sending a message
 ]
\ No newline at end of file
@@ -1,12 +1,41 @@
+import bisect
+
 from rest_framework.generics import ListAPIView, CreateAPIView
+from rest_framework.views import APIView
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Message
+from rest_framework.exceptions import ValidationError
+from core.utils import parse_id, parse_id_list
+from .models import ArchivedConversation, Message
+from .presence import snapshot
+from .retention import archived_messages, read_archive
+from .search import search_message_ids
 from .serializers import MessageSerializer
+from django.contrib.auth import get_user_model
 from django.db.models import Q
 
 
+def page_params(request, page_size, max_page_size):
+    """
+    Parses the `before` message id and `page_size` query parameters of the views paged
+    by message id. Returns (before or None, page size capped at `max_page_size`), with
+    `page_size` as the default size, and raises ValidationError for invalid values.
+    """
+    before = request.query_params.get('before')
+    if before is not None:
+        before = parse_id(before)
+        if before is None:
+            raise ValidationError({'before': 'Must be a message id.'})
+    requested_size = request.query_params.get('page_size')
+    if requested_size is not None:
+        page_size = parse_id(requested_size)
+        if not page_size:
+            raise ValidationError({'page_size': 'Must be a positive integer.'})
+    return before, min(page_size, max_page_size)
+
+
 class MessageListView(ListAPIView):
     """
     API view for retrieving a list of messages.
@@ -46,4 +75,90 @@ class SendMessageView(CreateAPIView):
         serializer.is_valid(raise_exception=True)
         serializer.save(sender=request.user)  # Automatically set the sender to the current user
         headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+
+class MessageSearchView(APIView):
+    """
+    API view for searching the authenticated user's messages.
+
+    `?q=` matches messages containing every word (prefixes included) through the
+    full-text index, newest first. Results are paged by message id: `next` links
+    to the following page (`?before=<id>`), and `page_size` sets the page length.
+    """
+    permission_classes = [IsAuthenticated]
+    page_size = 50
+    max_page_size = 100
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns one page of matching messages.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': 'A search query is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        before, page_size = page_params(request, self.page_size, self.max_page_size)
+
+        ids = search_message_ids(query, request.user, before=before, limit=page_size + 1)
+        has_next = len(ids) > page_size
+        ids = ids[:page_size]
+        messages = Message.objects.select_related('sender', 'receiver').in_bulk(ids)
+        results = MessageSerializer([messages[message_id] for message_id in ids if message_id in messages], many=True).data
+        next_url = replace_query_param(request.build_absolute_uri(), 'before', ids[-1]) if has_next else None
+        return Response({'next': next_url, 'results': results})
+
+
+
+class ArchivedMessagesView(APIView):
+    """
+    API view for the archived history of a conversation with another user.
+
+    Messages of long inactive conversations are moved to compressed cold storage by
+    `apply_message_retention`; this slower path reads them back, newest first, in the
+    same representation as live messages and paged like the message search (`next`,
+    `?before=<id>`, `page_size`).
+    """
+    permission_classes = [IsAuthenticated]
+    page_size = 100
+    max_page_size = 500
+
+    def get(self, request, user_id, *args, **kwargs):
+        """
+        Returns one page of the archived messages between the user and `user_id`.
+        """
+        first_user_id, second_user_id = sorted((request.user.pk, user_id))
+        if not ArchivedConversation.objects.filter(first_user_id=first_user_id, second_user_id=second_user_id).exists():
+            return Response({'next': None, 'results': []})
+        before, page_size = page_params(request, self.page_size, self.max_page_size)
+
+        records = read_archive(first_user_id, second_user_id)
+        if before is not None:  # Records are ordered by descending id
+            records = records[bisect.bisect_right(records, -before, key=lambda record: -record['id']):]
+        page = records[:page_size]
+        next_url = None
+        if len(records) > page_size:
+            next_url = replace_query_param(request.build_absolute_uri(), 'before', page[-1]['id'])
+        users = get_user_model().objects.in_bulk([first_user_id, second_user_id])
+        results = MessageSerializer(archived_messages(page, users), many=True).data
+        return Response({'next': next_url, 'results': results})
+
+
+
+class PresenceView(APIView):
+    """
+    API view reporting which of the given users are online.
+
+    `?ids=1,2,3` (up to 200 ids) returns {"users": {id: {"online", "last_seen"}}},
+    answered from the presence store in one round trip without touching the database
+    beyond authentication.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Returns the presence of the requested users.
+        """
+        ids = parse_id_list(request.query_params.get('ids'))
+        if ids is None:
+            return Response({'ids': 'A comma separated list of user ids is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'users': snapshot(ids)})
@@ -2,16 +2,25 @@ import os
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings') # Set the Django settings module
+os.environ.setdefault('ASGI_WORKER', '1') # Served by Uvicorn, so the channels app (Daphne runserver) is not loaded
 django.setup()
 
 from django.urls import path
+from django.conf import settings
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
 from channels.security.websocket import AllowedHostsOriginValidator
 from chat.consumers import ChatConsumer
+from core.deployment import check_process_model
+
+check_process_model() # Several workers need a shared channel layer and cache
 
 application = ProtocolTypeRouter({ # Define the ASGI application that will handle all incoming requests.
     "http": get_asgi_application(),
     "websocket": ChatConsumer.as_asgi(),
 })
+
+if settings.PRELOAD_APP: # Warm up before the first request (once in the gunicorn master with --preload)
+    from core.preload import warm
+    warm()
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Backends that keep their state in the memory of a single process
+PROCESS_LOCAL_CHANNEL_LAYERS = {'channels.layers.InMemoryChannelLayer'}
+PROCESS_LOCAL_CACHES = {'django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache'}
+
+
+def process_count(task_worker=False):
+    """
+    Number of processes sharing the chat and cache state: the server workers plus the
+    configured task workers (at least one when called from a task worker itself).
+    """
+    task_workers = max(settings.TASK_WORKER_PROCESSES, 1 if task_worker else 0)
+    return settings.WEB_CONCURRENCY + task_workers
+
+
+def process_local_state(): # Describe every configured backend whose state other processes cannot see
+    problems = []
+    channel_layer = settings.CHANNEL_LAYERS.get('default', {}).get('BACKEND')
+    if channel_layer in PROCESS_LOCAL_CHANNEL_LAYERS:
+        problems.append(f'the channel layer ({channel_layer}) only delivers chat messages and pushed events '
+                        f'to sockets of the sending process')
+    cache = settings.CACHES['default']['BACKEND']
+    if cache in PROCESS_LOCAL_CACHES:
+        problems.append(f'the cache ({cache}) keeps presence and the ad facet cache generation per process')
+    return problems
+
+
+def check_process_model(task_worker=False):
+    """
+    Refuses to start when several processes would each keep their own copy of the
+    chat and cache state, which silently drops messages and serves stale data.
+    Called by core.asgi before the application is built and by run_worker
+    (`task_worker=True`).
+    """
+    processes = process_count(task_worker)
+    problems = process_local_state()
+    if processes > 1 and problems:
+        raise ImproperlyConfigured(
+            f'{processes} processes (WEB_CONCURRENCY={settings.WEB_CONCURRENCY}, '
+            f'TASK_WORKER_PROCESSES={settings.TASK_WORKER_PROCESSES}) cannot share process-local state: '
+            + '; '.join(problems) + '. Set REDIS_URL or run a single process.'
+        )
@@ -0,0 +1,9 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    # Raised when a conditional request (e.g. an If-Match version) no longer matches the stored object
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The resource was modified by another request.'
+    default_code = 'precondition_failed'
@@ -0,0 +1,68 @@
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from django.utils import translation
+
+logger = logging.getLogger(__name__)
+
+
+def walk_patterns(resolver):
+    """
+    Populates a URL resolver and all resolvers included by it (Django fills their
+    reverse/namespace dicts lazily on the first lookup) and yields every view callback.
+    """
+    resolver.reverse_dict  # Triggers _populate()
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from walk_patterns(pattern)
+        else:
+            yield pattern.callback
+
+
+def warm_serializers(callbacks):
+    """
+    Builds the fields of every view's serializer once, which imports the lazily loaded
+    parts of DRF and fills the models' _meta field caches. Returns the number of serializers.
+    """
+    serializer_classes = set()
+    for callback in callbacks:
+        view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+        serializer_class = getattr(view_class, 'serializer_class', None)
+        if serializer_class is not None:
+            serializer_classes.add(serializer_class)
+    for serializer_class in serializer_classes:
+        try:
+            serializer_class().fields
+        except Exception:  # Serializers that need a request in their context are warmed by the first request
+            logger.debug('Could not warm %s', serializer_class.__name__, exc_info=True)
+    return len(serializer_classes)
+
+
+def warm_connections():
+    """
+    Opens every configured database connection once (loading the driver and validating
+    the settings), then closes them: connections must not be shared with forked workers.
+    """
+    for connection in connections.all():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    connections.close_all()
+
+
+def warm():
+    """
+    Does the work Django otherwise defers to the first request, so a worker serves it at
+    full speed. Called from core.asgi when PRELOAD_APP is set; with gunicorn --preload
+    it runs once in the master process before the workers are forked.
+    """
+    start = time.perf_counter()
+    callbacks = list(walk_patterns(get_resolver()))
+    serializers = warm_serializers(callbacks)
+    translation.activate(settings.LANGUAGE_CODE)  # Loads the translation catalogs
+    translation.deactivate()
+    warm_connections()
+    logger.info('Preloaded %d URL patterns and %d serializers in %.0fms',
+                len(callbacks), serializers, (time.perf_counter() - start) * 1000)
@@ -48,19 +48,54 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'channels',
     'corsheaders',
     'users',
     'ads',
     'chat',
-    'public'
+    'public',
+    'metrics',
+    'tasks',
+    'sync',
 ]
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# The channels app only provides the websocket-capable `runserver`; loading it imports Daphne and Twisted
+# (~240ms per process). core.asgi sets ASGI_WORKER=1, so Uvicorn workers skip it.
+if os.environ.get('ASGI_WORKER') != '1':
+    INSTALLED_APPS.append('channels')
+
+# Deployment profile. WEB_CONCURRENCY is the number of server worker processes (gunicorn reads the same
+# variable) and TASK_WORKER_PROCESSES the number of separate `run_worker` processes (deployment/worker.service).
+# Chat delivery, presence and cache invalidation only work across processes when the channel layer and the
+# cache are shared, so with REDIS_URL set both live in Redis; otherwise they are process-local and core.asgi
+# and run_worker refuse to start when more than one process is configured (see core.deployment).
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+TASK_WORKER_PROCESSES = int(os.environ.get('TASK_WORKER_PROCESSES', '0'))
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+    }
 
 
 REST_FRAMEWORK = {
@@ -71,6 +106,7 @@ REST_FRAMEWORK = {
 }
 
 MIDDLEWARE = [
+    'metrics.middleware.RequestMetricsMiddleware', # First, so the timings cover the rest of the stack
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -162,3 +198,80 @@ STATIC_ROOT = REACT_APP_STATIC_PATH
 # Media files (CSS, JavaScript, Images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Seconds the ad browse facet counts (/api/ads/facets/) stay cached; any ad change invalidates them sooner
+AD_FACETS_CACHE_TIMEOUT = 60
+
+# Trending ads and recommendations (`python manage.py compute_trending`). Ad detail views are buffered in
+# each process and written in batches of AD_VIEW_BUFFER_SIZE (ad, viewer) pairs or every AD_VIEW_FLUSH_INTERVAL seconds.
+AD_VIEW_BUFFER_SIZE = 500
+AD_VIEW_FLUSH_INTERVAL = 30
+TRENDING_WINDOW_DAYS = 7  # Signals older than this are ignored and their view rows pruned
+TRENDING_HALF_LIFE_HOURS = 24
+TRENDING_CONTACT_WEIGHT = 5  # A started chat thread counts as much as this many views
+TRENDING_SIZE = 500  # Trending ads stored
+RECOMMENDATIONS_PER_USER = 20
+RECOMMENDATION_PROFILE_SIZE = 10  # Features (category, location, price band) kept per user profile
+
+# Chat retention (`python manage.py apply_message_retention`). Conversations without messages for
+# CHAT_ARCHIVE_AFTER_DAYS move to gzip compressed JSONL files under CHAT_ARCHIVE_ROOT, still readable
+# through /api/messages/archive/<user id>/; messages of deactivated users are deleted.
+CHAT_ARCHIVE_AFTER_DAYS = 180
+CHAT_ARCHIVE_ROOT = os.path.join(BASE_DIR, 'chat_archive')
+CHAT_PURGE_DEACTIVATED_USERS = True
+CHAT_RETENTION_BATCH_SIZE = 1000
+CHAT_ARCHIVE_CACHE_SIZE = 32  # Parsed archives kept in memory per process while they are paged through
+
+# Chat presence and typing events (chat.presence): carried by the channel layer and kept in the cache,
+# never in the database. A user counts as online while a socket refreshes their entry within PRESENCE_TTL
+# seconds; going offline is announced only after PRESENCE_OFFLINE_GRACE seconds without a reconnect.
+PRESENCE_TTL = 90
+PRESENCE_OFFLINE_GRACE = 5
+PRESENCE_SEEN_TTL = 30 * 24 * 3600
+TYPING_EVENT_INTERVAL = 3  # Seconds between forwarded typing events per conversation
+CHAT_EVENT_BURST = 20  # Ephemeral events a socket may send at once ...
+CHAT_EVENT_RATE = 5  # ... and per second after that
+
+# Offline-sync change log (/api/sync/). Entries older than this are removed by `prune_sync_changes`;
+# clients with an older token download everything again.
+SYNC_CHANGE_RETENTION_DAYS = 30
+
+# Per-endpoint latency, query count, SQL and serialization time (metrics app). Served at /api/metrics/
+# and in a Server-Timing header. Off by default; the middleware and timers are not installed at all then.
+PERFORMANCE_METRICS_ENABLED = os.environ.get('PERFORMANCE_METRICS', '0') == '1'
+PERFORMANCE_METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Media uploads are stored under a content hash of the file, so a media URL never changes content
+# and can be cached by browsers forever.
+STORAGES = {
+    'default': {
+        'BACKEND': 'core.storage.ContentHashedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# How media and React build files are delivered once a Django view has resolved them:
+#   'sendfile' - FileResponse, which WSGI servers hand to the zero-copy file wrapper (sendfile)
+#   'accel'    - an empty response with X-Accel-Redirect so nginx streams the file itself
+#                (see the internal locations in deployment/tmu-marketplace-nginx.conf)
+FILE_DELIVERY_MODE = os.environ.get('FILE_DELIVERY_MODE', 'sendfile')
+MEDIA_ACCEL_PREFIX = '/internal/media/'
+REACT_APP_ACCEL_PREFIX = '/internal/build/'
+
+# Cache-Control for files whose URL changes whenever their content does (hashed media and bundles)
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Background tasks (tasks app). Side effects such as image writes, report handling and notifications are
+# queued in the database and executed by `python manage.py run_worker`. In eager mode they run in-process
+# right after the request's transaction commits, so development and tests need no worker.
+TASKS_ALWAYS_EAGER = os.environ.get('TASKS_ALWAYS_EAGER', '1' if DEBUG else '0') == '1'
+TASKS_RETRY_DELAY = 10  # Seconds before the first retry; doubled on every further attempt
+TASKS_LOCK_TIMEOUT = 600  # Running tasks older than this are assumed to belong to a dead worker
+TASKS_RETENTION_DAYS = 7
+UPLOAD_STAGING_ROOT = os.path.join(BASE_DIR, 'upload_staging')
+
+# Warm URL resolvers, serializer fields and database connections in core.asgi before serving (core.preload).
+# With gunicorn --preload this happens once in the master and every forked worker starts warm.
+PRELOAD_APP = os.environ.get('DJANGO_PRELOAD', '0') == '1'
@@ -0,0 +1,33 @@
+import hashlib
+import posixpath
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentHashedStorage(FileSystemStorage):
+    """
+    File system storage that names uploaded files after a hash of their content.
+
+    `ad_images/IMG_0042.JPG` is stored as `ad_images/<sha256 prefix>.jpg`, so the
+    resulting URL is stable for the lifetime of the content and can be served with
+    an immutable Cache-Control header. Identical uploads share a single file.
+    """
+    hash_length = 20
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name  # Identical content has already been stored
+        return super()._save(name, content)
+
+    def hashed_name(self, name, content): # Build the content addressed name for an upload
+        sha256 = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory, file_name = posixpath.split(name)
+        extension = posixpath.splitext(file_name)[1].lower()
+        return posixpath.join(directory, sha256.hexdigest()[:self.hash_length] + extension)
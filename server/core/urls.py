@@ -1,14 +1,18 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from public.views import serve_media
 
 urlpatterns = [ # This is the root URL configuration for the Django project
     path('api/ads/', include('ads.urls')),
     path('api/messages/', include('chat.urls')),
     path('api/users/', include('users.urls')),
     path('api/admin/', admin.site.urls),
+    path('api/metrics/', include('metrics.urls')),
+    path('api/sync/', include('sync.urls')),
+    # Media files are resolved by Django and delivered with sendfile or nginx's X-Accel-Redirect
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media),
+    # Every other path falls through to the React app
+    path('', include('public.urls')),
 ]
-
-if settings.DEBUG: # If the project is in debug mode, serve media files using Whitenoise
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
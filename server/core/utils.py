@@ -0,0 +1,32 @@
+MAX_LOOKUP_IDS = 200 # Upper bound on the number of objects that can be hydrated by id in one request
+MAX_ID_DIGITS = 18 # Longer values cannot be database ids (and would overflow a 64-bit integer)
+
+
+def parse_id(value):
+    """
+    Parses a single id query parameter (e.g. "42").
+
+    Returns None unless `value` consists of ASCII digits and is short enough to be a database id.
+    """
+    if value is not None and value.isascii() and value.isdigit() and len(value) <= MAX_ID_DIGITS:
+        return int(value)
+    return None
+
+
+def parse_id_list(raw_ids, limit=MAX_LOOKUP_IDS):
+    """
+    Parses a comma separated `ids` query parameter (e.g. "3,7,12").
+
+    Non-numeric (or overlong) values are ignored, duplicates are dropped and parsing stops once
+    `limit` ids have been collected. Returns None when the parameter was not supplied.
+    """
+    if raw_ids is None:
+        return None
+    ids = {}  # Insertion ordered, with constant time duplicate checks
+    for value in raw_ids.split(','):
+        if len(ids) >= limit:
+            break
+        value = parse_id(value.strip())
+        if value is not None:
+            ids.setdefault(value)
+    return list(ids)
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class MetricsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'metrics'
+
+    def ready(self): # Install the DB and serializer timers only when instrumentation is switched on
+        from django.conf import settings
+        if settings.PERFORMANCE_METRICS_ENABLED:
+            from .instrumentation import install
+            install()
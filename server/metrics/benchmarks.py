@@ -0,0 +1,283 @@
+import asyncio
+import io
+import json
+import math
+import re
+import time
+
+from channels.testing import HttpCommunicator, WebsocketCommunicator
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+from ads.models import Ad
+from chat.models import Message
+from users.models import CustomUser
+
+from .synthetic import SyntheticDataGenerator
+
+BENCHMARK_PASSWORD = 'Benchmark123!'
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(sorted_values, fraction): # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return 0.0
+    rank = max(int(math.ceil(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+class BenchmarkResult:
+    """
+    Timings and query counts collected for one benchmark scenario.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.timings = []
+        self.queries = []
+        self.errors = 0
+        self.wall_time = 0.0
+
+    def add(self, duration, queries, ok=True):
+        self.timings.append(duration)
+        self.queries.append(queries)
+        if not ok:
+            self.errors += 1
+
+    def summary(self): # Machine readable summary, in milliseconds and requests/second
+        timings = sorted(self.timings)
+        count = len(timings)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'mean_ms': round(sum(timings) / count * 1000, 3) if count else 0.0,
+            'p50_ms': round(percentile(timings, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 0.99) * 1000, 3),
+            'throughput_rps': round(count / self.wall_time, 1) if self.wall_time else 0.0,
+            'queries_per_request': round(sum(self.queries) / count, 2) if count else 0.0,
+        }
+
+
+class AsgiClient:
+    """
+    Minimal HTTP client that drives the ASGI application in-process, so requests
+    go through the same ProtocolTypeRouter, middleware and views a server would use.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def request(self, method, path, body=b'', content_type=None, token=None):
+        headers = [(b'host', b'localhost'), (b'content-length', str(len(body)).encode())]
+        if content_type:
+            headers.append((b'content-type', content_type.encode()))
+        if token:
+            headers.append((b'authorization', f'Token {token}'.encode()))
+        communicator = HttpCommunicator(self.application, method, path, body=body, headers=headers)
+        return await communicator.get_response(timeout=30)
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post_json(self, path, data, **kwargs):
+        return await self.request('POST', path, json.dumps(data).encode(), 'application/json', **kwargs)
+
+    async def multipart(self, method, path, data, **kwargs):
+        return await self.request(method, path, encode_multipart(BOUNDARY, data), MULTIPART_CONTENT, **kwargs)
+
+
+def response_queries(response): # Query count reported by RequestMetricsMiddleware in Server-Timing
+    for name, value in response['headers']:
+        if name.lower() == b'server-timing':
+            match = SERVER_TIMING_QUERIES.search(value.decode())
+            if match:
+                return int(match.group(1))
+    return 0
+
+
+async def measure(name, iterations, call, check, concurrency=1):
+    """
+    Runs `call(i)` for i in range(iterations) with up to `concurrency` in flight.
+
+    `call` returns an HTTP response from AsgiClient and `check(response)` decides
+    whether it succeeded. Each call's wall time and its query count are recorded.
+    """
+    result = BenchmarkResult(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await call(i)
+            result.add(time.perf_counter() - start, response_queries(response), check(response))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(i) for i in range(iterations)))
+    result.wall_time = time.perf_counter() - start
+    return result
+
+
+MICRO_BENCHMARKS = {}
+
+
+def micro_benchmark(name):
+    """
+    Registers a micro-benchmark. The decorated function receives the seeded users
+    and returns a zero-argument callable; the callable is what gets timed.
+    """
+    def register(setup):
+        MICRO_BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def run_micro_benchmarks(users, rounds=20):
+    """
+    Times each registered micro-benchmark `rounds` times (after one warm-up call)
+    and returns a BenchmarkResult per benchmark.
+    """
+    results = []
+    for name, setup in MICRO_BENCHMARKS.items():
+        target = setup(users)
+        target()
+        result = BenchmarkResult(f'micro: {name}')
+        start_all = time.perf_counter()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            target()
+            result.add(time.perf_counter() - start, 0)
+        result.wall_time = time.perf_counter() - start_all
+        results.append(result)
+    return results
+
+
+@micro_benchmark('AdSerializer x100')
+def serialize_ads(users):
+    from ads.serializers import AdSerializer
+    ads = list(Ad.objects.select_related('owned_by').prefetch_related('images')[:100])
+    return lambda: AdSerializer(ads, many=True).data
+
+
+@micro_benchmark('MessageSerializer x100')
+def serialize_messages(users):
+    from chat.serializers import MessageSerializer
+    messages = list(Message.objects.select_related('sender', 'receiver')[:100])
+    return lambda: MessageSerializer(messages, many=True).data
+
+
+@micro_benchmark('parse_id_list (200 ids)')
+def parse_ids(users):
+    from core.utils import parse_id_list
+    raw_ids = ','.join(str(i) for i in range(200))
+    return lambda: parse_id_list(raw_ids)
+
+
+def placeholder_image(name='benchmark.png', size=(64, 64)): # Small in-memory PNG used for upload scenarios
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 60)).save(buffer, format='PNG')
+    buffer.seek(0)
+    buffer.name = name
+    return buffer
+
+
+def seed_benchmark_data(users=200, ads=2000, reports=200, messages=5000, seed=0):
+    """
+    Seeds a deterministic data set for the benchmarks with SyntheticDataGenerator
+    and returns the generated users, each with an auth token and BENCHMARK_PASSWORD.
+    """
+    generator = SyntheticDataGenerator(seed)
+    generator.generate_users(users, BENCHMARK_PASSWORD, tokens=True)
+    generator.generate_ads(ads)
+    generator.generate_reports(reports)
+    generator.generate_messages(messages)
+    return list(CustomUser.objects.filter(id__in=generator.user_ids).select_related('auth_token').order_by('id'))
+
+
+async def run_http_benchmarks(application, users, iterations, concurrency):
+    """
+    Drives the REST API: ad browsing filter combinations, detail and batch lookups,
+    ad create/edit, reporting, login and the message list.
+    """
+    from asgiref.sync import sync_to_async
+
+    client = AsgiClient(application)
+    owner = users[0]
+    token = owner.auth_token.key
+    ad_ids = await sync_to_async(lambda: list(Ad.objects.values_list('id', flat=True)[:200]))()
+    owned_ad = await sync_to_async(lambda: Ad.objects.create(
+        title='Benchmark edit target', description='Edited repeatedly', owned_by=owner))()
+
+    def status(expected): # Check for a single expected status code
+        return lambda response: response['status'] == expected
+
+    ad_queries = {
+        'ads list': '/api/ads/',
+        'ads by category': '/api/ads/?category=TB',
+        'ads by category+location': '/api/ads/?category=EL&location=NY',
+        'ads by price range': '/api/ads/?min_price=10&max_price=100',
+        'ads by status+location': '/api/ads/?status=NS&location=TE',
+        'ads near region': '/api/ads/?near=NY&radius=15',
+        'ads facets': '/api/ads/facets/?category=TB&max_price=100',
+        'ads batch ids (200)': '/api/ads/?ids=' + ','.join(map(str, ad_ids)),
+    }
+    results = []
+    for name, path in ad_queries.items():
+        results.append(await measure(name, iterations, lambda i, path=path: client.get(path), status(200), concurrency))
+
+    results.append(await measure(
+        'ad detail', iterations, lambda i: client.get(f'/api/ads/{ad_ids[i % len(ad_ids)]}/'), status(200), concurrency))
+    results.append(await measure('ad create', iterations, lambda i: client.multipart('POST', '/api/ads/create/', {
+        'title': f'Created {i}', 'description': 'Benchmark', 'price': '12.50', 'type': 'IS', 'category': 'EL',
+        'location': 'TE', 'images': [placeholder_image()],
+    }, token=token), status(201)))
+    results.append(await measure('ad edit', iterations, lambda i: client.multipart('PUT', '/api/ads/edit/', {
+        'pk': owned_ad.pk, 'title': f'Edited {i}', 'description': 'Benchmark', 'price': '10.00', 'type': 'IS',
+        'category': 'EL', 'location': 'TE', 'status': 'NS',
+    }, token=token), lambda response: response['status'] < 300))
+    results.append(await measure('ad report', iterations, lambda i: client.post_json(
+        f'/api/ads/report/{ad_ids[i % len(ad_ids)]}/', {'report_reason': 'SPAM'}), status(202), concurrency))
+    results.append(await measure('login', max(iterations // 5, 1), lambda i: client.post_json(
+        '/api/users/login', {'username': users[i % len(users)].username, 'password': BENCHMARK_PASSWORD}),
+        status(200)))
+    results.append(await measure('message list', iterations, lambda i: client.get(
+        '/api/messages/', token=users[i % len(users)].auth_token.key), status(200), concurrency))
+    return results
+
+
+async def run_websocket_benchmark(application, users, iterations, receivers=20):
+    """
+    Connects `receivers` chat clients plus one sender and measures the time from a
+    sender's message to its delivery on the receiver's socket (save, serialize and fan-out).
+    """
+    from .registry import registry
+
+    sender = users[0]
+    targets = users[1:receivers + 1]
+    sockets = []
+    for user in [sender] + targets:
+        communicator = WebsocketCommunicator(application, f'/api/chat/?token={user.auth_token.key}')
+        connected, _ = await communicator.connect()
+        if not connected:
+            raise RuntimeError(f'WebSocket connection for {user.username} was rejected')
+        sockets.append(communicator)
+    sender_socket, receiver_sockets = sockets[0], sockets[1:]
+
+    key = ('websocket', 'websocket.receive', 'ChatConsumer')
+    before = registry.endpoints[key].queries if key in registry.endpoints else 0
+    result = BenchmarkResult('websocket chat fan-out')
+    start_all = time.perf_counter()
+    for i in range(iterations):
+        index = i % len(targets)
+        start = time.perf_counter()
+        await sender_socket.send_to(text_data=json.dumps({'message': f'ping {i}', 'receiver': targets[index].id}))
+        await sender_socket.receive_from(timeout=10)  # Sender confirmation
+        await receiver_sockets[index].receive_from(timeout=10)
+        result.add(time.perf_counter() - start, 0)
+    result.wall_time = time.perf_counter() - start_all
+
+    after = registry.endpoints[key].queries if key in registry.endpoints else 0
+    result.queries = [(after - before) / iterations] * iterations
+    for communicator in sockets:
+        await communicator.disconnect()
+    return result
@@ -0,0 +1,74 @@
+import time
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+
+# The measurements of the request or consumer event currently being handled, if any
+current_record = ContextVar('current_record', default=None)
+
+
+class RequestRecord:
+    """
+    Measurements collected while handling a single request or consumer event.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+        self.serializer_depth = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+
+    def server_timing(self): # Value of the Server-Timing response header
+        return (
+            f'db;dur={self.sql_time * 1000:.2f};desc="{self.queries} queries", '
+            f'serialize;dur={self.serialization_time * 1000:.2f}, '
+            f'total;dur={self.duration * 1000:.2f}'
+        )
+
+
+def query_timer(execute, sql, params, many, context): # Connection execute wrapper counting and timing SQL
+    record = current_record.get()
+    if record is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record.queries += 1
+        record.sql_time += time.perf_counter() - start
+
+
+def attach_query_timer(sender, connection, **kwargs): # Install the timer on every new database connection
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def timed_data(data_property): # Wrap a serializer `.data` property so only the outermost call is timed
+    def data(self):
+        record = current_record.get()
+        if record is None:
+            return data_property.fget(self)
+        record.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return data_property.fget(self)
+        finally:
+            record.serializer_depth -= 1
+            if record.serializer_depth == 0:
+                record.serialization_time += time.perf_counter() - start
+    return property(data)
+
+
+def install(): # Hook the timers into Django's database layer and DRF's serializers
+    from rest_framework import serializers  # Imported here so importing the middleware stays cheap when disabled
+
+    connection_created.connect(attach_query_timer, dispatch_uid='metrics.query_timer')
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.data.fget, 'metrics_timed', False):
+            serializer_class.data = timed_data(serializer_class.data)
+            serializer_class.data.fget.metrics_timed = True
@@ -0,0 +1,153 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from ads.models import Ad
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Integration check of the multi-process deployment profile. Starts several ASGI
+    server processes (Daphne, one port each) against the configured database and
+    verifies that state is consistent across them:
+
+      - a chat message sent through one worker reaches the receiver's socket on another
+      - an ad change made outside the workers shows up in the cached facets of every worker
+
+    Run it with the same environment as the servers, e.g.
+
+        REDIS_URL=redis://127.0.0.1:6379/0 python manage.py check_multiprocess --workers 3
+
+    Without a shared channel layer and cache the workers refuse to start, which the
+    check reports. The users and ads it creates are deleted afterwards.
+    """
+    help = 'Start several ASGI workers and verify chat delivery and ad caching are consistent across them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=3, help='Number of server processes')
+        parser.add_argument('--port', type=int, default=8300, help='Port of the first worker; the others follow')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Seconds to wait for startup and messages')
+
+    def handle(self, *args, **options):
+        try:
+            import simple_websocket  # Installed with python-socketio
+        except ImportError:
+            raise CommandError('check_multiprocess needs the simple-websocket package')
+        self.simple_websocket = simple_websocket
+        self.timeout = options['timeout']
+        ports = [options['port'] + index for index in range(options['workers'])]
+
+        failures = []
+        servers = []
+        users = []
+        try:
+            servers = [self.start_server(port, options['workers']) for port in ports]
+            for port, server in zip(ports, servers):
+                self.wait_until_listening(port, server)
+            self.stdout.write(f'Started {len(servers)} workers on ports {ports[0]}-{ports[-1]}')
+
+            users = self.create_users()
+            for index, port in enumerate(ports):
+                other = ports[(index + 1) % len(ports)]
+                failures += self.check_chat_delivery(users, port, other)
+            failures += self.check_facets(users[0], ports)
+        finally:
+            for user in users:
+                user.delete()
+            for server in servers:
+                server.terminate()
+            for server in servers:
+                try:
+                    server.wait(self.timeout)
+                except subprocess.TimeoutExpired:
+                    server.kill()
+                    failures.append(f'worker {server.pid} did not shut down within {self.timeout:.0f}s')
+
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(f'FAIL {failure}'))
+        if failures:
+            raise CommandError(f'{len(failures)} multi-process check(s) failed')
+        self.stdout.write(self.style.SUCCESS('All multi-process checks passed'))
+
+    def start_server(self, port, workers):
+        env = {**os.environ, 'WEB_CONCURRENCY': str(workers), 'ASGI_WORKER': '1'}
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'daphne', '-b', '127.0.0.1', '-p', str(port), 'core.asgi:application'],
+            cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        server.log = log
+        return server
+
+    def wait_until_listening(self, port, server):
+        deadline = time.monotonic() + self.timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                server.log.seek(0)
+                output = server.log.read().decode(errors='replace').strip().splitlines()
+                raise CommandError(f'Worker on port {port} exited:\n' + '\n'.join(output[-5:]))
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError(f'Worker on port {port} did not start within {self.timeout:.0f}s')
+
+    def create_users(self):
+        prefix = f'multiprocess-{uuid.uuid4().hex[:8]}'
+        users = []
+        for name in ('sender', 'receiver'):
+            user = CustomUser.objects.create_user(username=f'{prefix}-{name}', email=f'{prefix}-{name}@example.com')
+            user.token = Token.objects.create(user=user).key
+            users.append(user)
+        return users
+
+    def check_chat_delivery(self, users, sender_port, receiver_port):
+        sender, receiver = users
+        description = f'chat message from worker :{sender_port} to worker :{receiver_port}'
+        sender_socket = self.simple_websocket.Client.connect(f'ws://127.0.0.1:{sender_port}/chat/?token={sender.token}')
+        receiver_socket = self.simple_websocket.Client.connect(f'ws://127.0.0.1:{receiver_port}/chat/?token={receiver.token}')
+        try:
+            time.sleep(0.2)  # Let the receiver join its group before the message is sent
+            text = f'check {uuid.uuid4().hex}'
+            sender_socket.send(json.dumps({'receiver': receiver.id, 'message': text}))
+            deadline = time.monotonic() + self.timeout
+            while time.monotonic() < deadline:
+                frame = receiver_socket.receive(timeout=max(deadline - time.monotonic(), 0))
+                if frame is None:
+                    break
+                if json.loads(frame).get('text') == text:
+                    self.stdout.write(f'ok   {description}')
+                    return []
+            return [f'{description}: not delivered within {self.timeout:.0f}s']
+        finally:
+            sender_socket.close()
+            receiver_socket.close()
+
+    def facet_totals(self, ports):
+        totals = []
+        for port in ports:
+            with urlopen(f'http://127.0.0.1:{port}/api/ads/facets/', timeout=self.timeout) as response:
+                totals.append(json.load(response)['total'])
+        return totals
+
+    def check_facets(self, owner, ports):
+        before = self.facet_totals(ports)  # Also fills each worker's facet cache
+        Ad.objects.create(title='Multi-process check', description='Created by check_multiprocess', owned_by=owner)
+        after = self.facet_totals(ports)
+        stale = [port for port, old, new in zip(ports, before, after) if new != old + 1]
+        if stale:
+            return [f'cached facets not invalidated on workers {stale} (totals {before} -> {after})']
+        self.stdout.write(f'ok   facet cache invalidated on all {len(ports)} workers')
+        return []
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from metrics.synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    """
+    Fills the configured database with realistic synthetic users, ads, ad images,
+    reports and chat messages for load testing and query tuning.
+
+        python manage.py generate_synthetic_data --users 50000 --ads 1000000 --messages 2000000
+    """
+    help = 'Generate large-scale synthetic fixtures (deterministic for a given --seed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create (0 reuses existing users)')
+        parser.add_argument('--ads', type=int, default=10000, help='Ads to create')
+        parser.add_argument('--reports', type=int, default=200, help='Ad reports to create')
+        parser.add_argument('--messages', type=int, default=20000, help='Chat messages to create')
+        parser.add_argument('--max-images', type=int, default=4, help='Maximum images per ad')
+        parser.add_argument('--placeholder-images', type=int, default=0,
+                            help='Render this many placeholder JPEGs with Pillow and attach them to ads; '
+                                 'with 0, image rows reference file names only')
+        parser.add_argument('--days', type=int, default=365, help='Spread timestamps over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create/transaction')
+        parser.add_argument('--password', default='Password123!', help='Password shared by generated users')
+        parser.add_argument('--tokens', action='store_true', help='Create an auth token for each generated user')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        generator = SyntheticDataGenerator(options['seed'], options['batch_size'], options['days'], self.stdout)
+
+        if options['users']:
+            generator.generate_users(options['users'], options['password'], options['tokens'])
+        else:
+            generator.use_existing_users()
+        if not generator.user_ids:
+            raise CommandError('There are no users to own the generated data; pass --users')
+
+        if options['placeholder_images']:
+            generator.generate_placeholder_images(options['placeholder_images'])
+        generator.generate_ads(options['ads'], options['max_images'])
+        generator.generate_reports(options['reports'])
+        generator.generate_messages(options['messages'])
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.perf_counter() - start:.1f}s'))
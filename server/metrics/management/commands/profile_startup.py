@@ -0,0 +1,108 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Executed in a fresh interpreter so every run is a real cold start of a worker
+STARTUP_SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import core.asgi
+imported = time.perf_counter()
+if {preload}:
+    from core.preload import warm
+    warm()
+warmed = time.perf_counter()
+from django.test import Client
+client = Client()
+timings = []
+for _ in range(2):
+    request_start = time.perf_counter()
+    client.get({path!r})
+    timings.append(time.perf_counter() - request_start)
+print(json.dumps({{'import': imported - start, 'warm': warmed - imported, 'first_request': timings[0], 'second_request': timings[1]}}))
+'''
+
+
+def parse_importtime(stderr):
+    """
+    Parses `python -X importtime` output into [(module, self_us, cumulative_us)].
+    """
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    """
+    Measures the cold start of an ASGI worker: importing core.asgi (django.setup(),
+    the middleware stack and chat consumer), the optional preload warm-up, and the
+    first and second request. Also lists the modules and packages that take the most
+    import time:
+
+        python manage.py profile_startup --runs 5 --top 25
+    """
+    help = 'Profile worker startup: import time per module and cold-start timings with and without preload'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts per mode (medians are reported)')
+        parser.add_argument('--top', type=int, default=20, help='Number of modules and packages to list')
+        parser.add_argument('--path', default='/api/ads/?ids=', help='URL requested after startup')
+        parser.add_argument('--output', help='Write the timings as JSON to this file')
+
+    def run_startup(self, preload, path, importtime=False):
+        command = [sys.executable]
+        if importtime:
+            command += ['-X', 'importtime']
+        command += ['-c', STARTUP_SCRIPT.format(preload=preload, path=path)]
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'core.settings')}
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        process = time.perf_counter() - start
+        if result.returncode != 0:
+            raise CommandError(f'Startup failed:\n{result.stderr[-2000:]}')
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        timings['process'] = process
+        return timings, result.stderr
+
+    def handle(self, *args, **options):
+        _, stderr = self.run_startup(False, options['path'], importtime=True)
+        modules = parse_importtime(stderr)
+        total = sum(self_us for _, self_us, _ in modules)
+
+        self.stdout.write(f'Import time of core.asgi: {total / 1000:.0f}ms over {len(modules)} modules\n')
+        self.stdout.write(f'{"module (self time)":<60}{"self ms":>10}{"cumul. ms":>12}')
+        for name, self_us, cumulative_us in sorted(modules, key=lambda module: -module[1])[:options['top']]:
+            self.stdout.write(f'{name:<60}{self_us / 1000:>10.1f}{cumulative_us / 1000:>12.1f}')
+
+        packages = Counter()
+        for name, self_us, _ in modules:
+            packages[name.split('.')[0]] += self_us
+        self.stdout.write(f'\n{"package":<60}{"self ms":>10}{"share":>12}')
+        for package, self_us in packages.most_common(options['top']):
+            self.stdout.write(f'{package:<60}{self_us / 1000:>10.1f}{self_us / total:>12.0%}')
+
+        results = {}
+        self.stdout.write(f'\n{"cold start (median ms)":<24}{"process":>10}{"import":>10}{"warm":>10}{"1st req":>10}{"2nd req":>10}')
+        for mode, preload in (('default', False), ('preload', True)):
+            runs = [self.run_startup(preload, options['path'])[0] for _ in range(options['runs'])]
+            medians = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            results[mode] = medians
+            self.stdout.write(
+                f'{mode:<24}{medians["process"]:>10.0f}{medians["import"]:>10.0f}{medians["warm"]:>10.0f}'
+                f'{medians["first_request"]:>10.1f}{medians["second_request"]:>10.1f}'
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'import_ms': total / 1000, 'modes': results}, output, indent=2)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import platform
+import subprocess
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from metrics import benchmarks
+from metrics.instrumentation import install
+
+
+class Command(BaseCommand):
+    """
+    Seeds a throwaway test database and drives the API and chat server through
+    the in-process ASGI application, then runs the registered micro-benchmarks.
+    Reports p50/p95/p99 latency, throughput and queries per request as JSON that
+    can be diffed between commits.
+
+        python manage.py run_benchmarks --output bench.json
+        python manage.py run_benchmarks --compare bench.json
+    """
+    help = 'Run the API and WebSocket benchmark suite against a seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Number of users to seed')
+        parser.add_argument('--ads', type=int, default=2000, help='Number of ads to seed')
+        parser.add_argument('--reports', type=int, default=200, help='Number of ad reports to seed')
+        parser.add_argument('--messages', type=int, default=5000, help='Number of chat messages to seed')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated data')
+        parser.add_argument('--iterations', type=int, default=100, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight for read scenarios')
+        parser.add_argument('--output', help='Write the JSON report to this file')
+        parser.add_argument('--compare', help='Previous JSON report to diff the results against')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connections['default'].creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with tempfile.TemporaryDirectory() as media_root, \
+                    override_settings(MEDIA_ROOT=media_root, PERFORMANCE_METRICS_ENABLED=True):
+                install()
+
+                start = time.perf_counter()
+                users = benchmarks.seed_benchmark_data(
+                    options['users'], options['ads'], options['reports'], options['messages'], options['seed'])
+                self.stdout.write(f'Seeded data in {time.perf_counter() - start:.2f}s')
+
+                results = asyncio.run(self.run_suite(users, options['iterations'], options['concurrency']))
+                results += benchmarks.run_micro_benchmarks(users)
+        finally:
+            connections['default'].creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'commit': self.git_revision(),
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': settings.DATABASES['default']['ENGINE'],
+            },
+            'options': {key: options[key] for key in ('users', 'ads', 'reports', 'messages', 'seed',
+                                                      'iterations', 'concurrency')},
+            'scenarios': {result.name: result.summary() for result in results},
+        }
+        self.print_report(report)
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                self.print_comparison(json.load(previous_file), report)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=2, sort_keys=True)
+            self.stdout.write(f'Report written to {options["output"]}')
+
+    async def run_suite(self, users, iterations, concurrency):
+        # Imported with metrics enabled so RequestMetricsMiddleware reports query counts in Server-Timing
+        from core.asgi import application
+        results = await benchmarks.run_http_benchmarks(application, users, iterations, concurrency)
+        results.append(await benchmarks.run_websocket_benchmark(application, users, iterations))
+        return results
+
+    def print_report(self, report):
+        self.stdout.write(f'{"scenario":<32} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"req/s":>9} {"queries":>8} {"errors":>7}')
+        for name, summary in report['scenarios'].items():
+            self.stdout.write(
+                f'{name:<32} {summary["p50_ms"]:>9.2f} {summary["p95_ms"]:>9.2f} {summary["p99_ms"]:>9.2f} '
+                f'{summary["throughput_rps"]:>9.1f} {summary["queries_per_request"]:>8.2f} {summary["errors"]:>7}'
+            )
+
+    def print_comparison(self, previous, current): # Relative change per scenario against an earlier report
+        self.stdout.write(f'\nCompared with {previous.get("commit") or "previous report"}:')
+        for name, summary in current['scenarios'].items():
+            before = previous.get('scenarios', {}).get(name)
+            if before is None:
+                self.stdout.write(f'{name:<32} (new scenario)')
+                continue
+            changes = []
+            for metric in ('p50_ms', 'p95_ms', 'throughput_rps', 'queries_per_request'):
+                if before[metric]:
+                    changes.append(f'{metric} {(summary[metric] - before[metric]) / before[metric] * 100:+.1f}%')
+            self.stdout.write(f'{name:<32} ' + '  '.join(changes))
+
+    @staticmethod
+    def git_revision():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
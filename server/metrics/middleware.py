@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import RequestRecord, current_record
+from .registry import registry
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, DB query count, SQL time and serialization time per endpoint.
+
+    Endpoints are keyed by their URL pattern (e.g. `api/ads/<int:pk>/`) so the
+    number of series stays bounded. The figures for the current request are also
+    sent back in a Server-Timing header. When PERFORMANCE_METRICS_ENABLED is off
+    the middleware removes itself from the stack at startup.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        record = RequestRecord()
+        token = current_record.set(record)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_record.reset(token)
+        record.finish()
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.route if match is not None else 'unmatched'
+        registry.observe('http', request.method, endpoint, record)
+        response['Server-Timing'] = record.server_timing()
+        return response
+
+
+class ConsumerMetricsMixin:
+    """
+    Channels consumer mixin recording each handled event (connect, receive,
+    disconnect, channel layer messages) the same way RequestMetricsMiddleware
+    records HTTP requests, keyed by consumer class and event type.
+    """
+
+    async def dispatch(self, message):
+        if not settings.PERFORMANCE_METRICS_ENABLED:
+            return await super().dispatch(message)
+
+        record = RequestRecord()
+        token = current_record.set(record)
+        try:
+            return await super().dispatch(message)
+        finally:
+            current_record.reset(token)
+            record.finish()
+            registry.observe('websocket', message['type'], type(self).__name__, record)
@@ -0,0 +1,95 @@
+import bisect
+import threading
+from collections import defaultdict
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EndpointStats:
+    """
+    Aggregated measurements for one endpoint (HTTP route or consumer event).
+
+    Attributes:
+        buckets (list): Non-cumulative request counts per LATENCY_BUCKETS bucket, plus +Inf.
+        count (int): Number of requests observed.
+        duration (float): Total wall clock time in seconds.
+        queries (int): Total number of database queries.
+        sql_time (float): Total time spent executing SQL, in seconds.
+        serialization_time (float): Total time spent in DRF serializer `.data`, in seconds.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialization_time = 0.0
+
+
+class MetricsRegistry:
+    """
+    Process-local store of per-endpoint statistics, rendered in the Prometheus text format.
+
+    Each worker process keeps its own registry, so a scrape reports the worker
+    that served it; label the scrape target per worker when running several.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = defaultdict(EndpointStats)
+
+    def observe(self, protocol, method, endpoint, record): # Fold a finished RequestRecord into the endpoint stats
+        with self.lock:
+            stats = self.endpoints[(protocol, method, endpoint)]
+            stats.buckets[bisect.bisect_left(LATENCY_BUCKETS, record.duration)] += 1
+            stats.count += 1
+            stats.duration += record.duration
+            stats.queries += record.queries
+            stats.sql_time += record.sql_time
+            stats.serialization_time += record.serialization_time
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def render(self): # Render every metric in the Prometheus text exposition format
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+
+        lines = [
+            '# HELP tmu_request_duration_seconds Request latency per endpoint.',
+            '# TYPE tmu_request_duration_seconds histogram',
+        ]
+        for key, stats in endpoints:
+            labels = self.labels(*key)
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += bucket_count
+                lines.append(f'tmu_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'tmu_request_duration_seconds_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f'tmu_request_duration_seconds_sum{{{labels}}} {stats.duration:.6f}')
+            lines.append(f'tmu_request_duration_seconds_count{{{labels}}} {stats.count}')
+
+        counters = [
+            ('tmu_request_db_queries_total', 'Database queries issued per endpoint.', 'queries', '{}'),
+            ('tmu_request_db_seconds_total', 'Time spent executing SQL per endpoint.', 'sql_time', '{:.6f}'),
+            ('tmu_request_serialization_seconds_total', 'Time spent in DRF serializers per endpoint.',
+             'serialization_time', '{:.6f}'),
+        ]
+        for name, help_text, attribute, value_format in counters:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, stats in endpoints:
+                value = value_format.format(getattr(stats, attribute))
+                lines.append(f'{name}{{{self.labels(*key)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def labels(protocol, method, endpoint):
+        endpoint = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+        return f'protocol="{protocol}",method="{method}",endpoint="{endpoint}"'
+
+
+registry = MetricsRegistry()
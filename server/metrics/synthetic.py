@@ -0,0 +1,300 @@
+import io
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from ads.models import Ad, AdImage, AdReport
+from chat.models import Message
+from users.models import CustomUser
+
+# Relative popularity of each category and location; downtown and textbooks dominate a campus marketplace
+CATEGORY_WEIGHTS = {
+    'TB': 22, 'EL': 18, 'CL': 12, 'FA': 10, 'GH': 6, 'SP': 6, 'MU': 4, 'BE': 4, 'GA': 2, 'LO': 3, 'OT': 5,
+}
+SERVICE_CATEGORY_WEIGHTS = {'TU': 60, 'SG': 25, 'RS': 15}
+LOCATION_WEIGHTS = {
+    'TE': 40, 'NY': 12, 'SC': 9, 'EB': 6, 'MV': 8, 'BR': 5, 'VA': 4, 'MK': 4, 'RH': 3, 'AP': 2, 'OS': 2, 'OK': 2,
+    'OT': 3,
+}
+TYPE_WEIGHTS = {'IS': 70, 'IW': 20, 'AS': 10}
+STATUS_WEIGHTS = {'NS': 80, 'SO': 15, 'DE': 5}
+REPORT_REASON_WEIGHTS = {'SPAM': 50, 'INAPPROPRIATE_CONTENT': 15, 'MISINFORMATION': 10, 'OTHER': 25}
+
+# Median price and spread (sigma of the log-normal) per category; None means the ad has no price
+PRICE_PROFILES = {
+    'TB': (45, 0.6), 'EL': (180, 0.9), 'CL': (25, 0.7), 'FA': (90, 0.8), 'GH': (35, 0.8), 'SP': (50, 0.9),
+    'MU': (150, 1.0), 'BE': (20, 0.6), 'GA': (30, 0.8), 'OT': (30, 1.0), 'TU': (35, 0.4), 'SG': (0, 0),
+    'RS': (15, 0.5), 'LO': None,
+}
+
+FIRST_NAMES = ['Aisha', 'Ben', 'Chloe', 'Daniel', 'Emily', 'Farah', 'Gabriel', 'Hannah', 'Isaac', 'Jasmine', 'Kevin',
+               'Leila', 'Marcus', 'Nadia', 'Omar', 'Priya', 'Quinn', 'Ravi', 'Sofia', 'Tyler', 'Uma', 'Victor',
+               'Wei', 'Ximena', 'Yusuf', 'Zara']
+LAST_NAMES = ['Ahmed', 'Brown', 'Chen', 'Da Silva', 'Edwards', 'Fernandes', 'Gupta', 'Ho', 'Ibrahim', 'Johnson',
+              'Kim', 'Li', 'Martin', 'Nguyen', 'Okafor', 'Patel', 'Rossi', 'Singh', 'Tremblay', 'Wong']
+TITLE_WORDS = {
+    'TB': ['Calculus textbook', 'Organic Chemistry 8th ed.', 'Intro to Psychology', 'Microeconomics notes bundle'],
+    'EL': ['MacBook Air', 'iPad with pencil', 'Noise cancelling headphones', 'Graphing calculator'],
+    'CL': ['Winter jacket', 'TMU hoodie', 'Running shoes', 'Leather boots'],
+    'FA': ['Desk lamp', 'IKEA desk', 'Mini fridge', 'Office chair'],
+    'GH': ['Board game collection', 'Nintendo Switch games', 'Chess set', 'Lego kit'],
+    'SP': ['Road bike', 'Yoga mat', 'Hockey skates', 'Dumbbell set'],
+    'MU': ['Acoustic guitar', 'MIDI keyboard', 'Ukulele', 'Audio interface'],
+    'BE': ['Hair straightener', 'Skincare set', 'Electric shaver', 'Perfume'],
+    'GA': ['Potted monstera', 'Herb planter', 'Balcony chairs', 'Grow light'],
+    'LO': ['Found: keys near library', 'Lost: black wallet', 'Found: student card', 'Lost: AirPods case'],
+    'TU': ['Calculus tutoring', 'Python tutoring', 'Essay editing help', 'Physics tutoring'],
+    'SG': ['Study group for final exams', 'Accounting study group', 'Weekly CS study session', 'Biology review group'],
+    'RS': ['Participants needed for survey', 'UX research study', 'Psychology experiment', 'Paid interview study'],
+    'OT': ['Parking spot for rent', 'Moving boxes', 'Concert tickets', 'Sublet room'],
+}
+MESSAGE_TEXTS = ['Hi, is this still available?', 'Would you take less?', 'Yes, it is still available.',
+                 'Can we meet on campus tomorrow?', 'Sure, how about the library at 3?', 'Sounds good!',
+                 'Does it come with the charger?', 'Sorry, it has been sold.', 'Thanks!', 'I can do cash or e-transfer.']
+
+
+@contextmanager
+def backdated(*fields):
+    """
+    Temporarily turns off auto_now_add on the given model fields so generated rows
+    can carry historical timestamps instead of the time they were inserted.
+    """
+    previous = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, previous):
+            field.auto_now_add = value
+
+
+class WeightedChoice:
+    """
+    Draws keys of a weight mapping with cumulative weights precomputed once.
+    """
+
+    def __init__(self, rng, weights):
+        self.rng = rng
+        self.keys = list(weights)
+        self.cum_weights = list(accumulate(weights.values()))
+
+    def __call__(self):
+        return self.rng.choices(self.keys, cum_weights=self.cum_weights)[0]
+
+
+class SyntheticDataGenerator:
+    """
+    Generates large, realistic data sets for users, ads, ad images, reports and messages.
+
+    Rows are inserted with bulk_create in batches, each batch in its own transaction.
+    Ads and messages are owned by a Zipf-distributed set of "power users", ad
+    categories and locations are skewed toward textbooks, electronics and downtown,
+    prices follow a per-category log-normal distribution and chat threads have a
+    long-tailed length. Output is deterministic for a given seed, except for the
+    per-run suffix that keeps generated usernames and emails unique.
+    """
+
+    def __init__(self, seed=0, batch_size=5000, days=365, stdout=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.days = days
+        self.stdout = stdout
+        self.now = timezone.now()
+        self.user_ids = []
+        self.owner_weights = []
+        self.image_names = []
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def batches(self, rows): # Split a row generator into lists of batch_size
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def insert(self, model, rows): # bulk_create rows batch by batch, each batch in its own transaction
+        start = time.perf_counter()
+        count = 0
+        created = []
+        for batch in self.batches(rows):
+            with transaction.atomic():
+                created = model.objects.bulk_create(batch)
+            count += len(batch)
+            yield created
+        self.log(f'{model.__name__}: {count} rows in {time.perf_counter() - start:.1f}s')
+
+    def random_time(self, after=None): # A timestamp in the generated window, optionally after `after`
+        start = after or self.now - timedelta(days=self.days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=span * self.rng.random() ** 0.5)
+
+    def pick_owner(self): # Zipf distributed user, so a few power users own most ads and threads
+        return self.rng.choices(self.user_ids, cum_weights=self.owner_weights)[0]
+
+    def generate_users(self, count, password='Password123!', tokens=False):
+        password_hash = make_password(password)
+        run = uuid.uuid4().hex[:8]  # Keeps usernames and emails unique across runs, even after deletions
+
+        def rows():
+            for i in range(count):
+                first_name = self.rng.choice(FIRST_NAMES)
+                last_name = self.rng.choice(LAST_NAMES)
+                yield CustomUser(
+                    username=f'{first_name.lower()}.{last_name.lower().replace(" ", "")}.{run}{i}',
+                    email=f'student.{run}{i}@torontomu.ca',
+                    first_name=first_name,
+                    last_name=last_name,
+                    password=password_hash,
+                    date_joined=self.random_time(),
+                )
+
+        for created in self.insert(CustomUser, rows()):
+            ids = [user.pk for user in created]
+            self.user_ids.extend(ids)
+            if tokens:
+                Token.objects.bulk_create(Token(key=Token.generate_key(), user_id=user_id) for user_id in ids)
+        self.set_owner_weights()
+
+    def use_existing_users(self): # Generate ads and messages for users that are already in the database
+        self.user_ids = list(CustomUser.objects.order_by('pk').values_list('pk', flat=True))
+        self.set_owner_weights()
+
+    def set_owner_weights(self):
+        shuffled = self.user_ids[:]
+        self.rng.shuffle(shuffled)
+        self.user_ids = shuffled
+        self.owner_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(shuffled))))
+
+    def generate_placeholder_images(self, count):
+        """
+        Renders `count` small solid-colour JPEGs with Pillow into the default storage
+        and uses them round-robin for generated AdImage rows.
+        """
+        from PIL import Image, ImageDraw
+
+        for i in range(count):
+            colour = tuple(self.rng.randint(40, 220) for _ in range(3))
+            image = Image.new('RGB', (320, 240), colour)
+            ImageDraw.Draw(image).text((20, 110), f'TMU Marketplace #{i}', fill=(255, 255, 255))
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=70)
+            self.image_names.append(default_storage.save(f'ad_images/placeholder{i}.jpg', ContentFile(buffer.getvalue())))
+
+    def price_for(self, category):
+        profile = PRICE_PROFILES.get(category)
+        if profile is None:
+            return None
+        median, sigma = profile
+        if median == 0:
+            return Decimal('0.00')
+        price = min(math.exp(self.rng.gauss(math.log(median), sigma)), 99999999)
+        return Decimal(round(price)) if price > 20 else Decimal(price).quantize(Decimal('0.01'))
+
+    def generate_ads(self, count, max_images=4):
+        pick_type = WeightedChoice(self.rng, TYPE_WEIGHTS)
+        pick_category = WeightedChoice(self.rng, CATEGORY_WEIGHTS)
+        pick_service = WeightedChoice(self.rng, SERVICE_CATEGORY_WEIGHTS)
+        pick_location = WeightedChoice(self.rng, LOCATION_WEIGHTS)
+        pick_status = WeightedChoice(self.rng, STATUS_WEIGHTS)
+        # Most ads have one or two photos; the weight halves for every extra image
+        image_counts = WeightedChoice(self.rng, {n: 2 ** (max_images - n) for n in range(max_images + 1)}) \
+            if max_images else (lambda: 0)
+
+        def rows():
+            for i in range(count):
+                ad_type = pick_type()
+                category = pick_service() if ad_type == 'AS' else pick_category()
+                title = self.rng.choice(TITLE_WORDS[category])
+                yield Ad(
+                    title=title,
+                    description=f'{title}. Good condition, pick up near campus or can meet downtown. Ref {i}.',
+                    type=ad_type,
+                    category=category,
+                    location=pick_location(),
+                    status=pick_status(),
+                    price=self.price_for(category),
+                    created_at=self.random_time(),
+                    owned_by_id=self.pick_owner(),
+                )
+
+        created_at_field = Ad._meta.get_field('created_at')
+        uploaded_at_field = AdImage._meta.get_field('uploaded_at')
+        with backdated(created_at_field, uploaded_at_field):
+            for ads in self.insert(Ad, rows()):
+                images = []
+                for ad in ads:
+                    for n in range(image_counts()):
+                        if self.image_names:
+                            name = self.image_names[(ad.pk + n) % len(self.image_names)]
+                        else:
+                            name = f'ad_images/generated{ad.pk}_{n}.jpg'
+                        images.append(AdImage(ad_id=ad.pk, image=name, uploaded_at=ad.created_at))
+                with transaction.atomic():
+                    AdImage.objects.bulk_create(images, batch_size=self.batch_size)
+
+    def generate_reports(self, count):
+        pick_reason = WeightedChoice(self.rng, REPORT_REASON_WEIGHTS)
+        ad_ids = list(Ad.objects.order_by('pk').values_list('pk', flat=True))  # Sampled directly, so deleted ads leave no gaps
+        if not ad_ids:
+            return
+
+        def rows():
+            for i in range(count):
+                reason = pick_reason()
+                yield AdReport(
+                    ad_id=self.rng.choice(ad_ids),
+                    reported_by_id=self.rng.choice(self.user_ids) if self.rng.random() < 0.8 else None,
+                    report_reason=reason,
+                    other_details='Looks like a duplicate listing.' if reason == 'OTHER' else '',
+                    reported_at=self.random_time(),
+                )
+
+        with backdated(AdReport._meta.get_field('reported_at')):
+            for _ in self.insert(AdReport, rows()):
+                pass
+
+    def generate_messages(self, count, mean_thread_length=6):
+        """
+        Generates roughly `count` messages as buyer/seller threads whose lengths are
+        geometrically distributed around `mean_thread_length`, alternating senders
+        with increasing timestamps.
+        """
+
+        def rows():
+            generated = 0
+            while generated < count:
+                seller = self.pick_owner()
+                buyer = self.rng.choice(self.user_ids)
+                if buyer == seller:
+                    continue
+                length = min(int(self.rng.expovariate(1 / mean_thread_length)) + 1, count - generated)
+                timestamp = self.random_time()
+                for n in range(length):
+                    sender, receiver = (buyer, seller) if n % 2 == 0 else (seller, buyer)
+                    timestamp += timedelta(minutes=self.rng.expovariate(1 / 45))
+                    yield Message(sender_id=sender, receiver_id=receiver, text=self.rng.choice(MESSAGE_TEXTS),
+                                  timestamp=min(timestamp, self.now))
+                generated += length
+
+        with backdated(Message._meta.get_field('timestamp')):
+            for _ in self.insert(Message, rows()):
+                pass
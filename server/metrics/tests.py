@@ -0,0 +1,21 @@
+from django.test import TestCase
+
+from ads.models import Ad, AdReport
+from users.models import CustomUser
+from .synthetic import SyntheticDataGenerator
+
+
+class SyntheticDataTests(TestCase):
+    def test_repeated_runs_survive_deletions(self):
+        generator = SyntheticDataGenerator(batch_size=10)
+        generator.generate_users(5)
+        generator.generate_ads(20, max_images=0)
+        CustomUser.objects.filter(pk=generator.user_ids[0]).delete()  # Also deletes that user's ads
+        Ad.objects.filter(pk__in=Ad.objects.order_by('pk').values('pk')[5:10]).delete()
+
+        generator = SyntheticDataGenerator(batch_size=10)
+        generator.generate_users(5)
+        generator.generate_reports(50)
+        self.assertEqual(CustomUser.objects.count(), 9)
+        self.assertEqual(AdReport.objects.count(), 50)
+        self.assertFalse(AdReport.objects.exclude(ad__in=Ad.objects.all()).exists())
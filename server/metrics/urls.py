@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import prometheus_metrics
+
+urlpatterns = [
+    path('', prometheus_metrics, name='prometheus-metrics'), # URL pattern for the Prometheus scrape endpoint
+]
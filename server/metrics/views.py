@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from .registry import registry
+
+
+def prometheus_metrics(request): # Expose the collected metrics in the Prometheus text format
+    if not settings.PERFORMANCE_METRICS_ENABLED:
+        raise Http404('Performance metrics are disabled')
+    allowed = request.META.get('REMOTE_ADDR') in settings.PERFORMANCE_METRICS_ALLOWED_IPS
+    if not (allowed or request.user.is_staff):
+        raise Http404('Performance metrics are not available')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PublicConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'public'
+
+    def ready(self): # Index the React build once at startup instead of probing the disk per request
+        from django.conf import settings
+        from .manifest import get_manifest
+        get_manifest(settings.REACT_APP_BUILD_PATH)
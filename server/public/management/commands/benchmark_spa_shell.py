@@ -0,0 +1,54 @@
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, RequestFactory
+from django.views.static import serve as static_serve
+
+from public.manifest import get_manifest
+from public.views import serve_react
+
+
+class Command(BaseCommand):
+    """
+    Measures requests/second for the SPA shell and a hashed bundle at the view
+    level, alongside the previous per-request static_serve of index.html, plus
+    the shell through the full middleware stack.
+    """
+    help = 'Benchmark requests/second for serve_react'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per scenario')
+
+    def handle(self, *args, **options):
+        manifest = get_manifest(settings.REACT_APP_BUILD_PATH)
+        bundle = next((path for path in sorted(manifest.files) if path.endswith('.js')), 'index.html')
+        root = settings.REACT_APP_BUILD_PATH
+        client = Client()
+        factory = RequestFactory()
+        count = options['requests']
+
+        def legacy_shell(): # What serve_react did before: an is_file() probe, then static_serve of index.html
+            request = factory.get('/inbox/3')
+            Path(root, 'inbox/3').is_file()
+            return b''.join(static_serve(request, 'index.html', root).streaming_content)
+
+        scenarios = [
+            ('legacy static_serve shell', legacy_shell),
+            ('shell', lambda: serve_react(factory.get('/inbox/3'), 'inbox/3', root)),
+            ('shell (gzip)', lambda: serve_react(
+                factory.get('/inbox/3', HTTP_ACCEPT_ENCODING='gzip, br'), 'inbox/3', root)),
+            ('shell (etag hit)', lambda: serve_react(
+                factory.get('/inbox/3', HTTP_IF_NONE_MATCH=manifest.index_etag), 'inbox/3', root)),
+            ('bundle ' + bundle, lambda: serve_react(factory.get('/' + bundle), bundle, root)),
+            ('shell (full middleware stack)', lambda: client.get('/inbox/3')),
+        ]
+        for label, send in scenarios:
+            start = time.perf_counter()
+            for _ in range(count):
+                response = send()
+                if hasattr(response, 'close'):
+                    response.close()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f'{label:<40} {count / elapsed:>9.0f} req/s')
@@ -0,0 +1,51 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from public.manifest import PRECOMPRESSED_VARIANTS
+
+COMPRESSIBLE_EXTENSIONS = ('.html', '.js', '.css', '.json', '.map', '.svg', '.txt', '.ico')
+
+
+class Command(BaseCommand):
+    """
+    Writes precompressed .gz (and .br, when the optional `brotli` package is
+    installed) siblings next to every text asset in the React build, so
+    serve_react and nginx's gzip_static can send them without compressing per request.
+    """
+    help = 'Precompress the React build directory (.gz and optionally .br)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--build-path', default=settings.REACT_APP_BUILD_PATH, help='React build directory')
+        parser.add_argument('--min-size', type=int, default=1024, help='Skip files smaller than this many bytes')
+
+    def handle(self, *args, **options):
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+            self.stdout.write('brotli is not installed, only writing .gz files')
+
+        suffixes = tuple(suffix for coding, suffix in PRECOMPRESSED_VARIANTS)
+        written = 0
+        for dirpath, dirnames, filenames in os.walk(options['build_path']):
+            for filename in filenames:
+                if filename.endswith(suffixes) or not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                    continue
+                fullpath = os.path.join(dirpath, filename)
+                with open(fullpath, 'rb') as source:
+                    content = source.read()
+                if len(content) < options['min_size']:
+                    continue
+
+                with open(fullpath + '.gz', 'wb') as target:
+                    target.write(gzip.compress(content, compresslevel=9, mtime=0))
+                written += 1
+                if brotli is not None:
+                    with open(fullpath + '.br', 'wb') as target:
+                        target.write(brotli.compress(content, quality=11))
+                    written += 1
+
+        self.stdout.write(f'Wrote {written} precompressed files')
@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+# Precompressed sibling suffixes, in order of preference when the client accepts several
+PRECOMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+
+
+@dataclass
+class BuildFile:
+    """
+    A file in the React build directory.
+
+    Attributes:
+        path (str): Path relative to the build directory, using forward slashes.
+        content_type (str): The MIME type of the uncompressed file.
+        mtime (float): Modification time, used for Last-Modified.
+        variants (dict): Maps a content-coding ('br', 'gzip') to the relative path of its precompressed sibling.
+    """
+    path: str
+    content_type: str
+    mtime: float
+    variants: dict = field(default_factory=dict)
+
+
+class BuildManifest:
+    """
+    In-memory index of the React build directory.
+
+    The directory is walked once, so serving a request never touches the file
+    system to find out whether a path exists. index.html (the SPA shell) is
+    kept in memory together with a gzip copy and a content ETag.
+    """
+
+    def __init__(self, document_root):
+        self.document_root = document_root
+        self.files = {}
+        self.index_html = b''
+        self.index_gzip = b''
+        self.index_etag = ''
+        self.scan()
+
+    def scan(self): # Walk the build directory and record every file and its precompressed siblings
+        paths = set()
+        for dirpath, dirnames, filenames in os.walk(self.document_root):
+            for filename in filenames:
+                fullpath = os.path.join(dirpath, filename)
+                paths.add(os.path.relpath(fullpath, self.document_root).replace(os.sep, '/'))
+
+        suffixes = tuple(suffix for coding, suffix in PRECOMPRESSED_VARIANTS)
+        for path in paths:
+            if path.endswith(suffixes) and path.rsplit('.', 1)[0] in paths:
+                continue  # Precompressed sibling, recorded as a variant below
+            content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            mtime = os.stat(os.path.join(self.document_root, path)).st_mtime
+            build_file = BuildFile(path, content_type, mtime)
+            for coding, suffix in PRECOMPRESSED_VARIANTS:
+                if path + suffix in paths:
+                    build_file.variants[coding] = path + suffix
+            self.files[path] = build_file
+
+        if 'index.html' in self.files:
+            with open(os.path.join(self.document_root, 'index.html'), 'rb') as index_file:
+                self.index_html = index_file.read()
+            self.index_gzip = gzip.compress(self.index_html, compresslevel=9, mtime=0)
+            self.index_etag = '"%s"' % hashlib.sha256(self.index_html).hexdigest()[:32]
+
+    @staticmethod
+    def is_asset_path(path): # Paths that name a file (bundles, images, ...) rather than a client side route
+        return path.startswith('static/') or '.' in posixpath.basename(path).strip('.')
+
+    @staticmethod
+    def accepted_codings(request): # Content-codings listed in Accept-Encoding, ignoring those with q=0
+        codings = set()
+        for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+            coding, _, params = item.strip().partition(';')
+            if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                continue
+            codings.add(coding.strip().lower())
+        return codings
+
+    def select_variant(self, request, build_file): # Pick the best precompressed variant the client accepts
+        if build_file.variants:
+            codings = self.accepted_codings(request)
+            for coding, suffix in PRECOMPRESSED_VARIANTS:
+                if coding in build_file.variants and (coding in codings or '*' in codings):
+                    return coding, build_file.variants[coding]
+        return None, build_file.path
+
+
+@lru_cache(maxsize=None)
+def get_manifest(document_root):
+    """
+    Returns the BuildManifest for `document_root`, scanning it on first use.
+
+    Call get_manifest.cache_clear() to pick up a new build without restarting.
+    """
+    return BuildManifest(document_root)
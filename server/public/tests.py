@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .manifest import get_manifest
+from .views import serve_react
+
+
+class PublicTestCase(SimpleTestCase): # Shared fixture: a temporary directory removed after each test
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.addCleanup(get_manifest.cache_clear)
+
+    def write(self, path, content):
+        fullpath = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(fullpath), exist_ok=True)
+        with open(fullpath, 'wb') as output:
+            output.write(content)
+
+
+class ServeMediaTests(PublicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('ad_images/abc123.jpg', b'jpeg')
+        self.url = f'{settings.MEDIA_URL}ad_images/abc123.jpg'
+
+    def test_sendfile_mode_streams_the_file(self):
+        with self.settings(MEDIA_ROOT=self.root, FILE_DELIVERY_MODE='sendfile'):
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b''.join(response.streaming_content), b'jpeg')
+            self.assertEqual(response['Cache-Control'], settings.IMMUTABLE_CACHE_CONTROL)
+            self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_accel_mode_hands_the_file_to_nginx(self):
+        with self.settings(MEDIA_ROOT=self.root, FILE_DELIVERY_MODE='accel'):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'{settings.MEDIA_ACCEL_PREFIX}ad_images/abc123.jpg')
+        self.assertEqual(response.content, b'')
+
+    def test_missing_and_escaping_paths_are_refused(self):
+        with self.settings(MEDIA_ROOT=self.root):
+            self.assertEqual(self.client.get(f'{settings.MEDIA_URL}ad_images/missing.jpg').status_code, 404)
+            self.assertEqual(self.client.get(f'{settings.MEDIA_URL}ad_images').status_code, 404)
+            self.assertEqual(self.client.get(f'{settings.MEDIA_URL}../manage.py').status_code, 400)  # SuspiciousFileOperation
+
+
+@override_settings(FILE_DELIVERY_MODE='sendfile')
+class ServeReactTests(PublicTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('index.html', b'<html>shell</html>')
+        self.write('static/js/main.1a2b.js', b'bundle')
+        self.write('static/js/main.1a2b.js.gz', gzip.compress(b'bundle'))
+        self.factory = RequestFactory()
+
+    def get(self, path, **headers):
+        return serve_react(self.factory.get(f'/{path}', **headers), path, document_root=self.root)
+
+    def test_client_routes_get_the_shell(self):
+        response = self.get('ads/42', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), b'<html>shell</html>')
+        self.assertEqual(self.get('', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_missing_assets_are_not_found(self):
+        for path in ('static/js/other.js', 'logo.png'):
+            with self.assertRaises(Http404):
+                self.get(path)
+
+    def test_bundles_use_precompressed_variants(self):
+        response = self.get('static/js/main.1a2b.js', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'bundle')
+        self.assertEqual(response['Cache-Control'], settings.IMMUTABLE_CACHE_CONTROL)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertNotIn('Content-Encoding', self.get('static/js/main.1a2b.js', HTTP_ACCEPT_ENCODING='gzip;q=0'))
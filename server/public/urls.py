@@ -4,6 +4,6 @@ from django.conf import settings
 
 from .views import serve_react
 
-urlpatterns = [
-    re_path(r"^(?P<path>.*)$", serve_react, {"document_root": settings.REACT_APP_BUILD_PATH}),
-]
\ No newline at end of file
+urlpatterns = [ # API paths are excluded so unknown endpoints still 404 (and APPEND_SLASH keeps working)
+    re_path(r"^(?!api/)(?P<path>.*)$", serve_react, {"document_root": settings.REACT_APP_BUILD_PATH}),
+]
@@ -1,13 +1,113 @@
+import mimetypes
+import os
 import posixpath
-from pathlib import Path
+import stat
+from urllib.parse import quote
 
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
 from django.utils._os import safe_join
-from django.views.static import serve as static_serve
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .manifest import get_manifest
+
+
+def file_response(request, path, document_root, accel_prefix, content_type, mtime, encoding=None, cache_control=None):
+    """
+    Returns a response delivering the already resolved file `path` from `document_root`.
+
+    Depending on settings.FILE_DELIVERY_MODE the file is either handed to nginx
+    with X-Accel-Redirect (under `accel_prefix`) or returned as a FileResponse,
+    which WSGI servers send with sendfile.
+    """
+    if settings.FILE_DELIVERY_MODE == "accel":
+        # nginx streams the file from its internal location; Django never opens it
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel_prefix + quote(path)
+    elif not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), mtime):
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(os.path.join(document_root, path), "rb"), content_type=content_type)
+        response["Last-Modified"] = http_date(mtime)
+        if encoding:
+            response["Content-Encoding"] = encoding
+
+    if cache_control:
+        response["Cache-Control"] = cache_control
+    return response
+
+
+def deliver_file(request, path, document_root, accel_prefix, cache_control=None):
+    """
+    Resolves `path` inside `document_root` and delivers it with file_response().
+
+    Raises Http404 for missing files.
+    """
+    path = posixpath.normpath(path).lstrip("/")
+    fullpath = safe_join(document_root, path)
+    try:
+        statobj = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(f"“{path}” does not exist")
+    if not stat.S_ISREG(statobj.st_mode):
+        raise Http404(f"“{path}” does not exist")
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    return file_response(
+        request, path, document_root, accel_prefix, content_type or "application/octet-stream",
+        statobj.st_mtime, encoding, cache_control,
+    )
+
+
+def serve_media(request, path): # Serve uploaded media; names are content hashed so they never change
+    return deliver_file(
+        request, path, settings.MEDIA_ROOT, settings.MEDIA_ACCEL_PREFIX, settings.IMMUTABLE_CACHE_CONTROL
+    )
+
+
+def serve_index(request, manifest): # Serve the in-memory SPA shell, honouring If-None-Match
+    if request.META.get("HTTP_IF_NONE_MATCH") == manifest.index_etag:
+        response = HttpResponseNotModified()
+    elif "gzip" in manifest.accepted_codings(request):
+        response = HttpResponse(manifest.index_gzip, content_type="text/html; charset=utf-8")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(manifest.index_html, content_type="text/html; charset=utf-8")
+    response["ETag"] = manifest.index_etag
+    response["Cache-Control"] = "no-cache"
+    patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
 
 def serve_react(request, path, document_root=None): # Serve the React app from a Django view
+    manifest = get_manifest(document_root)
     path = posixpath.normpath(path).lstrip("/")
-    fullpath = Path(safe_join(document_root, path))
-    if fullpath.is_file():
-        return static_serve(request, path, document_root)
+    build_file = manifest.files.get(path)
+
+    if build_file is None:
+        # Client side routes get the SPA shell; a missing bundle or image is a real 404
+        if manifest.is_asset_path(path) or not manifest.index_html:
+            raise Http404(f"“{path}” does not exist")
+        return serve_index(request, manifest)
+    if path == "index.html":
+        return serve_index(request, manifest)
+
+    # Bundles under static/ carry a content hash in their file name; everything else must revalidate
+    if path.startswith("static/"):
+        cache_control = settings.IMMUTABLE_CACHE_CONTROL
+    else:
+        cache_control = "no-cache"
+
+    if settings.FILE_DELIVERY_MODE == "accel":
+        encoding, file_path = None, path  # nginx picks precompressed siblings itself (gzip_static)
     else:
-        return static_serve(request, "index.html", document_root)
\ No newline at end of file
+        encoding, file_path = manifest.select_variant(request, build_file)
+    response = file_response(
+        request, file_path, document_root, settings.REACT_APP_ACCEL_PREFIX,
+        build_file.content_type, build_file.mtime, encoding, cache_control,
+    )
+    if build_file.variants:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
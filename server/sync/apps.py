@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class SyncConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'sync'
+
+    def ready(self): # Install the change log triggers once all tables exist (post_migrate is sent after every migration ran)
+        from .changes import install_triggers
+        post_migrate.connect(install_triggers, sender=self, dispatch_uid='sync.install_triggers')
@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from .models import Change
+
+NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+def log(kind, object_id, deleted, user_id='NULL'): # SQL statement (inside a trigger) appending one change
+    return f"INSERT INTO sync_change(kind, object_id, deleted, user_id, created_at) VALUES ('{kind}', {object_id}, {deleted}, {user_id}, {NOW});"
+
+
+def log_message(row, deleted): # A message change goes to the feeds of both participants
+    return (
+        log('message', f'{row}.id', deleted, f'{row}.sender_id')
+        + f" INSERT INTO sync_change(kind, object_id, deleted, user_id, created_at) SELECT 'message', {row}.id, {deleted}, {row}.receiver_id, {NOW}"
+        + f" WHERE {row}.receiver_id != {row}.sender_id;"
+    )
+
+
+# An ad image change is reported as a change of its ad, whose representation embeds the images
+TRIGGERS = {
+    'sync_ad_insert': ('AFTER INSERT ON ads_ad', log('ad', 'new.id', 0)),
+    'sync_ad_update': ('AFTER UPDATE ON ads_ad', log('ad', 'new.id', 0)),
+    'sync_ad_delete': ('AFTER DELETE ON ads_ad', log('ad', 'old.id', 1)),
+    'sync_adimage_insert': ('AFTER INSERT ON ads_adimage', log('ad', 'new.ad_id', 0)),
+    'sync_adimage_delete': ('AFTER DELETE ON ads_adimage', log('ad', 'old.ad_id', 0)),
+    'sync_message_insert': ('AFTER INSERT ON chat_message', log_message('new', 0)),
+    'sync_message_update': ('AFTER UPDATE ON chat_message', log_message('new', 0)),
+    'sync_message_delete': ('AFTER DELETE ON chat_message', log_message('old', 1)),
+}
+TRACKED_TABLES = {'ads_ad', 'ads_adimage', 'chat_message', 'sync_change'}
+
+
+def install_triggers(using='default', **kwargs):
+    """
+    Creates the triggers that fill the change log. Connected to post_migrate, so
+    they exist in every migrated (and test) database. Triggers require SQLite.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not TRACKED_TABLES <= set(connection.introspection.table_names()):
+        return
+    with connection.cursor() as cursor:
+        for name, (event, statements) in TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {statements} END')
+
+
+def current_token(): # Token of the newest change; syncing from it returns only later changes
+    latest = Change.objects.order_by('-id').values_list('id', flat=True).first()
+    return latest or 0
+
+
+def is_expired(token):
+    """
+    Whether changes after `token` may already have been pruned, in which case the
+    client has to download everything again.
+    """
+    oldest = Change.objects.order_by('id').values_list('id', flat=True).first()
+    return oldest is not None and token < oldest - 1
+
+
+@contextmanager
+def unlogged_deletes(kind, object_ids):
+    """
+    Removes the deletions of `object_ids` (of `kind`) logged inside the block, for
+    rows that leave the table but not the client's view: messages moved to the chat
+    archive still exist there, so syncing clients must not drop them.
+    """
+    start = current_token()
+    yield
+    Change.objects.filter(kind=kind, object_id__in=object_ids, deleted=True, id__gt=start).delete()
+
+
+def changes_since(token, user, limit):
+    """
+    Returns (changes, has_more): up to `limit` changes after `token` that are
+    visible to `user` (all ad changes and changes of the user's messages), in log
+    order. Each feed is read through its own (kind/user_id, id) index.
+    """
+    ads = Change.objects.filter(kind='ad', id__gt=token).order_by('id')[:limit + 1]
+    messages = Change.objects.filter(user_id=user.pk, id__gt=token).order_by('id')[:limit + 1]
+    changes = sorted([*ads, *messages], key=lambda change: change.id)
+    return changes[:limit], len(changes) > limit
+
+
+def collapse(changes):
+    """
+    Reduces a run of changes to the final state per object: returns
+    {kind: (ids to send, ids deleted)}.
+    """
+    latest = {}
+    for change in changes:
+        latest[(change.kind, change.object_id)] = change.deleted
+    result = {'ad': (set(), set()), 'message': (set(), set())}
+    for (kind, object_id), deleted in latest.items():
+        result[kind][1 if deleted else 0].add(object_id)
+    return result
+
+
+def prune(days, batch_size=5000):
+    """
+    Deletes change log entries older than `days` days in batches, always keeping
+    the newest entry so expired tokens can still be recognised. Returns the number
+    of deleted entries.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    newest = current_token()
+    deleted = 0
+    while True:
+        ids = list(Change.objects.filter(created_at__lt=cutoff, id__lt=newest).order_by('id')
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        Change.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sync.changes import prune
+
+
+class Command(BaseCommand):
+    """
+    Deletes offline-sync change log entries older than SYNC_CHANGE_RETENTION_DAYS. Clients
+    with an older token are told to download everything again. Schedule it e.g. daily.
+    """
+    help = 'Prune the offline-sync change log'
+
+    def handle(self, *args, **options):
+        deleted = prune(settings.SYNC_CHANGE_RETENTION_DAYS)
+        self.stdout.write(f'Deleted {deleted} change log entries')
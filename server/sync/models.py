@@ -0,0 +1,31 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """
+    One entry of the change log behind the offline-sync API (/api/sync/).
+
+    Rows are written by database triggers (see sync.changes), so every write to
+    ads, ad images and messages is recorded, including bulk and queryset updates.
+    The auto incrementing id is the sync token: a client that has seen id N only
+    needs the changes after N.
+
+    Attributes:
+        kind (str): 'ad' or 'message'.
+        object_id (int): Id of the changed ad or message.
+        deleted (bool): Whether the object was deleted.
+        user_id (int): For messages, the participant whose feed the change belongs to
+            (no foreign key, so deleting a user does not conflict with its log rows).
+        created_at (datetime): When the change happened.
+    """
+    kind = models.CharField(max_length=10)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'id'], name='sync_change_kind_idx'),
+            models.Index(fields=['user_id', 'id'], name='sync_change_user_idx'),
+        ]
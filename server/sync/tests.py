@@ -0,0 +1,81 @@
+import tempfile
+from datetime import timedelta
+
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from ads.models import Ad
+from chat.models import Message
+from chat.retention import RetentionRun
+from users.models import CustomUser
+from .changes import prune
+
+
+class SyncFeedTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='alice', email='alice@example.com')
+        self.other = CustomUser.objects.create_user(username='bob', email='bob@example.com')
+        self.third = CustomUser.objects.create_user(username='carol', email='carol@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def sync(self, token=None):
+        response = self.client.get('/api/sync/', {} if token is None else {'token': token})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_initial_sync_returns_token(self):
+        self.assertEqual(self.sync()['reset'], True)
+        for token in ('abc', '²', '9' * 19, '-1'):
+            self.assertEqual(self.client.get('/api/sync/', {'token': token}).status_code, 400, token)
+
+    def test_changes_since_token(self):
+        kept = Ad.objects.create(title='Lamp', description='Desk lamp', owned_by=self.other)
+        removed = Ad.objects.create(title='Chair', description='Office chair', owned_by=self.other)
+        token = self.sync()['token']
+
+        kept.title = 'Desk lamp'
+        kept.save()
+        removed.status = 'DE'
+        removed.save()
+        mine = Message.objects.create(sender=self.other, receiver=self.user, text='hi')
+        Message.objects.create(sender=self.other, receiver=self.third, text='not for alice')
+
+        data = self.sync(token)
+        self.assertEqual((data['reset'], data['has_more']), (False, False))
+        self.assertEqual([ad['title'] for ad in data['ads']['updated']], ['Desk lamp'])
+        self.assertEqual(data['ads']['deleted'], [removed.pk])
+        self.assertEqual([message['id'] for message in data['messages']['updated']], [mine.pk])
+
+        mine_id = mine.pk
+        mine.delete()
+        data = self.sync(data['token'])
+        self.assertEqual(data['messages'], {'updated': [], 'deleted': [mine_id]})
+        self.assertEqual(self.sync(data['token'])['ads'], {'updated': [], 'deleted': []})
+
+    def test_pruned_token_resets(self):
+        token = self.sync()['token']
+        for index in range(3):
+            Ad.objects.create(title=f'Ad {index}', description='Pruned', owned_by=self.other)
+        self.assertEqual(prune(days=-1), 2)  # The newest change is kept
+        self.assertEqual(self.sync(token)['reset'], True)
+
+    def test_archived_messages_are_not_reported_as_deleted(self):
+        archived = Message.objects.create(sender=self.other, receiver=self.user, text='old')
+        Message.objects.filter(pk=archived.pk).update(timestamp=timezone.now() - timedelta(days=365))
+        purged = Message.objects.create(sender=self.third, receiver=self.user, text='from a deactivated user')
+        CustomUser.objects.filter(pk=self.third.pk).update(is_active=False)
+        token = self.sync()['token']
+
+        with override_settings(CHAT_ARCHIVE_ROOT=self.archive_root()):
+            run = RetentionRun(batch_size=10)
+            run.purge_deactivated_users()
+            run.archive_inactive(timezone.now() - timedelta(days=180))
+        self.assertFalse(Message.objects.filter(pk__in=[archived.pk, purged.pk]).exists())
+        self.assertEqual(self.sync(token)['messages'], {'updated': [], 'deleted': [purged.pk]})
+
+    def archive_root(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        return root.name
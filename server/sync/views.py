@@ -0,0 +1,65 @@
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+
+from ads.models import Ad
+from ads.serializers import AdSerializer
+from chat.models import Message
+from chat.serializers import MessageSerializer
+from core.utils import parse_id
+from .changes import changes_since, collapse, current_token, is_expired
+
+
+class SyncView(APIView):
+    """
+    API view returning what changed in ads and the user's messages since a sync token.
+
+    Without `?token=` it only returns the current token ({"token", "reset": true}):
+    the client then downloads /api/ads/ and /api/messages/ in full once and syncs
+    from that token afterwards. With a token it returns the ads created, updated or
+    deleted (deleted and hidden ads are listed under "deleted") and the messages added
+    or removed since then, plus the token to use next time. When "has_more" is true the
+    client should call again right away; "reset" means the token expired and the
+    client has to download everything again.
+    """
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    page_size = 500
+
+    def get(self, request, *args, **kwargs):
+        token = request.query_params.get('token')
+        if token is None:
+            return Response({'token': str(current_token()), 'reset': True})
+        token = parse_id(token)
+        if token is None:
+            return Response({'token': 'Invalid sync token.'}, status=status.HTTP_400_BAD_REQUEST)
+        if is_expired(token):
+            return Response({'token': str(current_token()), 'reset': True})
+
+        changes, has_more = changes_since(token, request.user, self.page_size)
+        changed = collapse(changes)
+
+        ad_ids, deleted_ads = changed['ad']
+        ads = list(Ad.objects.filter(id__in=ad_ids).exclude(status='DE')
+                   .select_related('owned_by').prefetch_related('images'))
+        deleted_ads |= ad_ids - {ad.id for ad in ads}
+
+        message_ids, deleted_messages = changed['message']
+        messages = list(Message.objects.filter(id__in=message_ids).select_related('sender', 'receiver').order_by('id'))
+        deleted_messages |= message_ids - {message.id for message in messages}
+
+        return Response({
+            'token': str(changes[-1].id if changes else token),
+            'has_more': has_more,
+            'reset': False,
+            'ads': {
+                'updated': AdSerializer(ads, many=True, context={'request': request}).data,
+                'deleted': sorted(deleted_ads),
+            },
+            'messages': {
+                'updated': MessageSerializer(messages, many=True).data,
+                'deleted': sorted(deleted_messages),
+            },
+        })
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Task
+
+class TaskAdmin(admin.ModelAdmin): # Admin class for inspecting queued and failed background tasks.
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key')
+    readonly_fields = ('created_at', 'finished_at', 'locked_at', 'last_error')
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.deployment import check_process_model
+from tasks.models import Task
+from tasks.registry import claim, execute, release_stale
+
+
+class Command(BaseCommand):
+    """
+    Executes queued background tasks. Run one or more workers next to the web server:
+
+        python manage.py run_worker
+    """
+    help = 'Run the background task worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help='Tasks claimed per poll')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+
+    def handle(self, *args, **options):
+        check_process_model(task_worker=True)  # Pushed notifications need the channel layer the web workers use
+        self.stdout.write('Worker started')
+        while True:
+            close_old_connections()
+            release_stale(settings.TASKS_LOCK_TIMEOUT)
+            claimed = claim(options['batch_size'])
+            for queued in claimed:
+                execute(queued)
+                self.stdout.write(f'{queued} in {queued.attempts} attempt(s)')
+
+            if not claimed:
+                if options['once']:
+                    break
+                self.purge_finished()
+                time.sleep(options['sleep'])
+
+    def purge_finished(self): # Drop completed tasks past the retention period, a bounded batch at a time
+        cutoff = timezone.now() - timedelta(days=settings.TASKS_RETENTION_DAYS)
+        expired = Task.objects.filter(status='DO', finished_at__lt=cutoff).values_list('id', flat=True)[:1000]
+        Task.objects.filter(id__in=list(expired)).delete()
@@ -0,0 +1,47 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    A unit of background work stored in the database and executed by `run_worker`.
+
+    Attributes:
+        name (str): The registered name of the task function.
+        payload (dict): Keyword arguments for the task function (JSON).
+        idempotency_key (str): Optional unique key; enqueueing the same key twice runs the work once.
+        status (str): 'PE' (Pending), 'RU' (Running), 'DO' (Done) or 'FA' (Failed).
+        attempts (int): Number of times execution has been started.
+        max_attempts (int): Attempts allowed before the task is marked as failed.
+        run_after (datetime): The task is not picked up before this time (used for retry backoff).
+        locked_at (datetime): When a worker claimed the task.
+        last_error (str): Traceback of the most recent failure.
+    """
+
+    STATUS_CHOICES = [
+        ('PE', 'Pending'),
+        ('RU', 'Running'),
+        ('DO', 'Done'),
+        ('FA', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=2, choices=STATUS_CHOICES, default='PE')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='tasks_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,113 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {} # Maps task names to (function, max_attempts)
+
+
+def task(name, max_attempts=3):
+    """
+    Registers a function as a background task under `name`.
+
+    The function is called with the keyword arguments given to enqueue(), which
+    must be JSON serializable. Tasks may be retried, so they should be idempotent.
+    """
+    def register(func):
+        registry[name] = (func, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, idempotency_key=None, delay=0, **payload):
+    """
+    Schedules the task `name` with `payload` as keyword arguments and returns the Task.
+
+    If a task with the same `idempotency_key` already exists, nothing new is
+    scheduled and the existing task is returned. With TASKS_ALWAYS_EAGER the task
+    runs in-process as soon as the surrounding transaction commits.
+    """
+    if name not in registry:
+        raise KeyError(f'Unknown task "{name}"')
+    fields = {
+        'name': name,
+        'payload': payload,
+        'max_attempts': registry[name][1],
+        'run_after': timezone.now() + timedelta(seconds=delay),
+    }
+    if idempotency_key is None:
+        queued = Task.objects.create(**fields)
+    else:
+        queued, created = Task.objects.get_or_create(idempotency_key=idempotency_key, defaults=fields)
+        if not created:
+            return queued
+
+    if settings.TASKS_ALWAYS_EAGER:
+        transaction.on_commit(lambda: run_eagerly(queued))
+    return queued
+
+
+def run_eagerly(queued): # Claim and execute a task in the current process (TASKS_ALWAYS_EAGER)
+    if Task.objects.filter(pk=queued.pk, status='PE').update(
+            status='RU', locked_at=timezone.now(), attempts=F('attempts') + 1):
+        execute(Task.objects.get(pk=queued.pk))
+
+
+def claim(limit):
+    """
+    Claims up to `limit` due tasks for this worker and returns them.
+
+    Each task is claimed with a conditional UPDATE on its status, so concurrent
+    workers never run the same task twice, without needing row locks.
+    """
+    now = timezone.now()
+    due = Task.objects.filter(status='PE', run_after__lte=now).order_by('run_after', 'id') \
+        .values_list('id', flat=True)[:limit]
+    claimed = [
+        task_id for task_id in due
+        if Task.objects.filter(pk=task_id, status='PE').update(
+            status='RU', locked_at=now, attempts=F('attempts') + 1)
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by('id'))
+
+
+def execute(claimed):
+    """
+    Runs a claimed task. Failures are retried with exponential backoff until
+    max_attempts is reached, after which the task is marked as failed.
+    """
+    try:
+        func, max_attempts = registry[claimed.name]
+        func(**claimed.payload)
+    except Exception:
+        logger.exception('Task %s failed (attempt %s of %s)', claimed, claimed.attempts, claimed.max_attempts)
+        claimed.last_error = traceback.format_exc()
+        if claimed.attempts >= claimed.max_attempts:
+            claimed.status = 'FA'
+            claimed.finished_at = timezone.now()
+        else:
+            claimed.status = 'PE'
+            claimed.run_after = timezone.now() + timedelta(
+                seconds=settings.TASKS_RETRY_DELAY * 2 ** (claimed.attempts - 1))
+        claimed.save(update_fields=['status', 'run_after', 'last_error', 'finished_at'])
+    else:
+        claimed.status = 'DO'
+        claimed.finished_at = timezone.now()
+        claimed.save(update_fields=['status', 'finished_at'])
+
+
+def release_stale(timeout):
+    """
+    Returns tasks stuck in 'Running' for longer than `timeout` seconds (e.g. after a
+    worker crash) to the queue. Returns the number of released tasks.
+    """
+    cutoff = timezone.now() - timedelta(seconds=timeout)
+    return Task.objects.filter(status='RU', locked_at__lt=cutoff).update(status='PE', locked_at=None)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .models import Task
+from .registry import claim, enqueue, execute, release_stale, task
+
+calls = []
+
+
+@task('tests.record', max_attempts=2)
+def record(value, fail=False): # Test task: remembers its calls and optionally fails
+    calls.append(value)
+    if fail:
+        raise RuntimeError('Failed on purpose')
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False, TASKS_RETRY_DELAY=10)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_claimed_tasks_run_once(self):
+        queued = enqueue('tests.record', value=1)
+        claimed = claim(10)
+        self.assertEqual([claimed_task.pk for claimed_task in claimed], [queued.pk])
+        self.assertEqual(claim(10), [])
+        execute(claimed[0])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts, calls), ('DO', 1, [1]))
+
+    def test_idempotency_key_schedules_once(self):
+        first = enqueue('tests.record', idempotency_key='same', value=1)
+        second = enqueue('tests.record', idempotency_key='same', value=2)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failures_back_off_then_fail(self):
+        queued = enqueue('tests.record', value=1, fail=True)
+        execute(claim(1)[0])
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, 'PE')
+        self.assertIn('Failed on purpose', queued.last_error)
+        self.assertGreater(queued.run_after, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(claim(1), [])  # Not due before the retry delay
+
+        Task.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        execute(claim(1)[0])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('FA', 2))
+
+    def test_stale_tasks_are_released(self):
+        queued = enqueue('tests.record', value=1)
+        claim(1)
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(release_stale(600), 1)
+        self.assertEqual([claimed_task.pk for claimed_task in claim(1)], [queued.pk])
+
+    @override_settings(TASKS_ALWAYS_EAGER=True)
+    def test_eager_tasks_run_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            queued = enqueue('tests.record', value=3)
+            self.assertEqual(calls, [])
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, calls), ('DO', [3]))
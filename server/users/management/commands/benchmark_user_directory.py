@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks the user directory endpoint against a throwaway test database.
+
+    Seeds --users users with bulk_create, then times paginated listing,
+    prefix search and batched id lookups, reporting latency and query counts.
+    """
+    help = 'Benchmark /api/users/ listing, prefix search and id lookups at scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000, help='Number of users to seed')
+        parser.add_argument('--iterations', type=int, default=50, help='Requests per scenario')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options['users'])
+            client = Client()
+            count = options['users']
+            scenarios = [
+                ('first page', '/api/users/'),
+                ('deep page', f'/api/users/?page={max(count // 100, 1)}'),
+                ('prefix search', '/api/users/?search=user12'),
+                ('name search', '/api/users/?search=Jor'),
+                ('200 id lookup', '/api/users/?ids=' + ','.join(str(i) for i in range(1, count, max(count // 200, 1)))),
+            ]
+            for label, url in scenarios:
+                self.run_scenario(client, label, url, options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def seed(self, count): # Bulk insert users; the password hash is shared since it is never checked here
+        first_names = ['Jordan', 'Alex', 'Sam', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie']
+        last_names = ['Nguyen', 'Smith', 'Patel', 'Chen', 'Brown', 'Singh', 'Wilson', 'Lee']
+        start = time.perf_counter()
+        batch = []
+        for i in range(count):
+            batch.append(CustomUser(
+                username=f'user{i}',
+                email=f'user{i}@torontomu.ca',
+                first_name=first_names[i % len(first_names)],
+                last_name=last_names[(i // len(first_names)) % len(last_names)],
+                password='!',
+            ))
+            if len(batch) == 5000:
+                CustomUser.objects.bulk_create(batch)
+                batch = []
+        CustomUser.objects.bulk_create(batch)
+        self.stdout.write(f'Seeded {count} users in {time.perf_counter() - start:.2f}s')
+
+    def run_scenario(self, client, label, url, iterations):
+        timings = []
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        self.stdout.write(
+            f'{label:<15} status={response.status_code} bytes={len(response.content):<7} '
+            f'queries={len(queries)} p50={statistics.median(timings):.2f}ms p95={p95:.2f}ms'
+        )
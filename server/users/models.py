@@ -1,6 +1,13 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 class CustomUser(AbstractUser):
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True) # Profile picture field
 
+    class Meta: # Index the lowercased names so the directory's case-insensitive prefix search is a range scan
+        indexes = [
+            models.Index(Lower('username'), name='users_username_lower_idx'),
+            models.Index(Lower('first_name'), name='users_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='users_last_name_lower_idx'),
+        ]
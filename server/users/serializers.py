@@ -21,4 +21,11 @@ class CustomPasswordSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'password']
-        read_only_fields = ('id',)
\ No newline at end of file
+        read_only_fields = ('id',)
+
+class PublicUserSerializer(serializers.ModelSerializer):
+    #Serializer for the public user directory (no email, password hash or permission flags)
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'profile_picture']
+        read_only_fields = fields
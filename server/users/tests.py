@@ -1,3 +1,65 @@
-from django.test import TestCase
+from unittest import skipUnless
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.utils import MAX_LOOKUP_IDS, parse_id_list
+
+from .models import CustomUser
+from .views import CustomUserListView
+
+
+class UserDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for username, first_name, last_name in [('jdoe', 'John', 'Doe'), ('asmith', 'Anna', 'Johnson'),
+                                                ('Johnny', 'Bob', 'Brown'), ('zed', 'Zoe', 'Adjoh'),
+                                                ('eliza', 'Élodie', 'Ångström')]:
+            CustomUser.objects.create_user(username=username, email=f'{username}@example.com',
+                                           first_name=first_name, last_name=last_name)
+
+    def search(self, term):
+        response = self.client.get('/api/users/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.json()['results']]
+
+    def test_search_is_case_insensitive_prefix_match(self):
+        self.assertEqual(self.search('jOh'), ['Johnny', 'asmith', 'jdoe'])
+        self.assertEqual(self.search('doe'), ['jdoe'])
+        self.assertEqual(self.search('oh'), [])
+
+    def test_non_ascii_prefix_falls_back_to_istartswith(self):
+        self.assertEqual(self.search('Élo'), ['eliza'])
+        self.assertEqual(self.search('Ångs'), ['eliza'])
+        self.assertEqual(self.search('\U0010ffff'), [])
+        self.assertEqual(self.search('z\u007f'), [])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Checks the SQLite query plan')
+    def test_search_uses_name_indexes(self):
+        view = CustomUserListView()
+        view.request = type('Request', (), {'query_params': {'search': 'jo'}})()
+        sql, params = view.get_queryset().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertNotIn('SCAN users_customuser', plan)
+        for index in ('users_username_lower_idx', 'users_first_name_lower_idx', 'users_last_name_lower_idx'):
+            self.assertIn(index, plan)
+
+    def test_ids_lookup_returns_public_fields(self):
+        ids = list(CustomUser.objects.order_by('id').values_list('id', flat=True)[:2])
+        response = self.client.get('/api/users/', {'ids': f'{ids[0]},{ids[1]},{ids[0]}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(user['id'] for user in response.json()), ids)
+        self.assertNotIn('password', response.json()[0])
+
+
+class ParseIdListTests(SimpleTestCase):
+    def test_parses_deduplicates_and_ignores_invalid_values(self):
+        self.assertIsNone(parse_id_list(None))
+        self.assertEqual(parse_id_list('3, 7,x,3,,12,²,' + '9' * 5000), [3, 7, 12])
+
+    def test_stops_at_limit(self):
+        self.assertEqual(parse_id_list('1,1,2,3,4', limit=3), [1, 2, 3])
+        raw_ids = ','.join(str(value % 500) for value in range(200000))
+        self.assertEqual(parse_id_list(raw_ids), list(range(MAX_LOOKUP_IDS)))
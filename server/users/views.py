@@ -1,9 +1,12 @@
+import logging
+
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView
+from rest_framework.pagination import PageNumberPagination
 
 from .models import CustomUser
-from .serializers import CustomUserSerializer, CustomProfileSerializer, CustomPasswordSerializer
+from .serializers import CustomUserSerializer, CustomProfileSerializer, CustomPasswordSerializer, PublicUserSerializer
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from .models import CustomUser
@@ -13,10 +16,72 @@ from rest_framework.decorators import authentication_classes, permission_classes
 from rest_framework.authentication import SessionAuthentication, TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import FormParser
+from django.db.models import Q, Value
+from django.db.models.functions import Lower
+from core.utils import parse_id_list
+
+logger = logging.getLogger(__name__)
+
+class UserDirectoryPagination(PageNumberPagination): # Pagination for the user directory
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+def prefix_filter(field, prefix):
+    """
+    Case-insensitive `field` starts-with-`prefix` condition, written as a range on
+    lower(field) so it is served by the expression indexes on CustomUser (a LIKE
+    or istartswith lookup cannot use them).
+
+    SQLite's lower() only folds ASCII letters, so other prefixes fall back to istartswith.
+    """
+    if not prefix.isascii():
+        return Q(**{f'{field}__istartswith': prefix})
+    prefix = prefix.lower()
+    # Smallest string greater than every string with this prefix
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}_lower__gte': Lower(Value(prefix)), f'{field}_lower__lt': Lower(Value(upper))})
+
+class CustomUserListView(ListAPIView):
+    """
+    API view for the public user directory.
+
+    Supports prefix search on username, first and last name with `?search=`,
+    and batched lookup of up to MAX_LOOKUP_IDS users with `?ids=1,2,3`.
+    Only public profile fields are returned.
+    """
+    serializer_class = PublicUserSerializer
+    pagination_class = UserDirectoryPagination
+
+    def get_queryset(self):
+        queryset = CustomUser.objects.only(*PublicUserSerializer.Meta.fields).order_by('username', 'id')
+        ids = self.get_lookup_ids()
+        search = self.request.query_params.get('search', '').strip()
+
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+
+        if search:
+            queryset = queryset.alias(
+                username_lower=Lower('username'),
+                first_name_lower=Lower('first_name'),
+                last_name_lower=Lower('last_name'),
+            ).filter(
+                prefix_filter('username', search) |
+                prefix_filter('first_name', search) |
+                prefix_filter('last_name', search)
+            )
+
+        return queryset
+
+    def get_lookup_ids(self): # Parse the `ids` query parameter into a bounded list of integer ids
+        return parse_id_list(self.request.query_params.get('ids'))
 
-class CustomUserListView(ListAPIView): 
-    queryset = CustomUser.objects.all()
-    serializer_class = CustomUserSerializer
+    def paginate_queryset(self, queryset):
+        # Id lookups are already bounded, so return them in a single unpaginated response
+        if self.get_lookup_ids() is not None:
+            return None
+        return super().paginate_queryset(queryset)
     
 @api_view(['POST'])
 def login(request): # Login view to authenticate users and return auth token
@@ -74,12 +139,11 @@ def updateUser(request): # Update user profile view
     # Get the current user and update the fields with the provided data
     user = CustomUser.objects.get(id = request.data['id'])
     serializer = CustomProfileSerializer(user, request.data)
-    print(user.password)
     if serializer.is_valid():
         # Save the updated user and return the updated user data
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
-    print(serializer.errors)
+    logger.debug("Rejected update for user %s: %s", user.pk, serializer.errors)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -91,14 +155,13 @@ def updatePassword(request): # Update user password view
     user = CustomUser.objects.get(username = request.data['username'])
     password = request.data['password']
     serializer = CustomPasswordSerializer(user, request.data)
-    print(user.password)
     if serializer.is_valid():
         serializer.save()
         # Save the updated password to user object
         user.set_password(request.data['password'])
         user.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
-    print(serializer.errors)
+    logger.debug("Rejected update for user %s: %s", user.pk, serializer.errors)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
 @api_view(["POST"])